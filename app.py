@@ -1,20 +1,33 @@
+import configparser
 import json
 import logging
 import os
-from collections import OrderedDict
-from datetime import datetime
+import re
+import sqlite3
+import threading
+import time
+import weakref
+from collections import OrderedDict, namedtuple
+from contextlib import contextmanager
+from datetime import date, datetime
+from functools import lru_cache
 
 import dash
 import dash_core_components as dcc
 import dash_html_components as html
 import pandas as pd
+import numpy as np
 import pandas.io.sql as pandasql
 from numpy import nan
 import plotly.graph_objs as go
-from dash.dependencies import Input, Output, State
+from plotly.utils import PlotlyJSONEncoder
+from dash.dependencies import ClientsideFunction, Input, Output, State
+from dash.exceptions import PreventUpdate
 from dateutil.relativedelta import relativedelta
-from flask import send_from_directory
-from psycopg2 import connect
+from flask import g, has_request_context, send_from_directory
+from psycopg2 import connect, Error as PostgresError, InterfaceError, OperationalError
+from psycopg2.errors import InvalidSqlStatementName
+from psycopg2.pool import ThreadedConnectionPool
 
 
 ###################################################################################################
@@ -23,42 +36,781 @@ from psycopg2 import connect
 #                                                                                                 #
 ###################################################################################################
 
-database_url = os.getenv("DATABASE_URL")
-if database_url is not None:
-    con = connect(database_url)
-else:
-    import configparser
+def db_connect():
+    '''Connect to the heroku postgresql database if DATABASE_URL is set,
+    otherwise to our local data warehouse using the settings in db.cfg
+    '''
+    database_url = os.getenv("DATABASE_URL")
+    if database_url is not None:
+        return connect(database_url)
     CONFIG = configparser.ConfigParser()
     CONFIG.read('db.cfg')
     dbset = CONFIG['DBSETTINGS']
-    con = connect(**dbset)
-
-DATA = pandasql.read_sql('''
-                         SELECT street, direction, dt AS date, day_type, category, period, round(tt,1) tt, 
-                         CASE WHEN dt = first_value(dt) OVER (PARTITION BY direction, day_type, period ORDER BY dt DESC)
-                         THEN 1 ELSE 0 END AS most_recent,
-                         week_number, month_number 
-                         FROM king_pilot.dash_daily
-                         LEFT OUTER JOIN king_pilot.pilot_weeks weeks ON dt >= week AND dt < week + INTERVAL '1 week'
-                         LEFT OUTER JOIN king_pilot.pilot_months months ON dt >= month AND dt < month + INTERVAL '1 month'
-                         ''', con)
-BASELINE = pandasql.read_sql('''SELECT street, direction, from_intersection, to_intersection, 
-                             day_type, period, period_range, round(tt,1) tt 
-                             FROM king_pilot.dash_baseline ''',
-                             con)
-
-# Numbering Weeks and Months for Dropdown Selectors
-WEEKS = pandasql.read_sql('''SELECT * FROM king_pilot.pilot_weeks 
-                         ''', con)
-MONTHS = pandasql.read_sql('''SELECT * FROM king_pilot.pilot_months
-                         ''', con, parse_dates=['month'])
-WEEKS['label'] = 'Week ' + WEEKS['week_number'].astype(str) + ': ' + WEEKS['week'].astype(str)
-WEEKS.sort_values(by='week_number', inplace=True)
-MONTHS['label'] = 'Month ' + MONTHS['month_number'].astype(str) + ': ' + MONTHS['month'].dt.strftime("%b '%y")
-
-#Range types: Latest Day, Select Date, WEEKS, MONTHS
-RANGES = [pd.DataFrame(), pd.DataFrame(), WEEKS, MONTHS]
-con.close()
+    return connect(**dbset)
+
+# Where filtering and aggregation happen: "memory" loads each corridor's daily
+# data into pandas, "pushdown" queries materialized views in the database
+# (see sql/create-mview-dash_pushdown.sql) and only keeps small results
+DATA_BACKEND = os.getenv('DATA_BACKEND', 'memory')
+# Directory of SQLite databases, one per schema, standing in for the database
+# in pushdown mode, e.g. for local development (see pushdown_sqlite.py)
+PUSHDOWN_SQLITE = os.getenv('PUSHDOWN_SQLITE')
+# Connections to the database each process keeps open in pushdown mode
+PUSHDOWN_POOL_SIZE = int(os.getenv('PUSHDOWN_POOL_SIZE', 4))
+# Results of pushdown queries to keep in memory
+PUSHDOWN_CACHE_SIZE = int(os.getenv('PUSHDOWN_CACHE_SIZE', 256))
+# Rows to fetch at a time when building a corridor's heatmap in pushdown mode
+PUSHDOWN_CHUNK_ROWS = 50000
+
+PUSHDOWN_POOL = None
+PUSHDOWN_POOL_LOCK = threading.Lock()
+PUSHDOWN_SLOTS = threading.BoundedSemaphore(PUSHDOWN_POOL_SIZE)
+PUSHDOWN_LOCAL = threading.local()
+
+def sqlite_connect():
+    '''Connect to the SQLite stand-in, with each schema's database attached'''
+    con = sqlite3.connect(':memory:', check_same_thread=False)
+    for filename in sorted(os.listdir(PUSHDOWN_SQLITE)):
+        schema, extension = os.path.splitext(filename)
+        if extension == '.sqlite':
+            con.execute('ATTACH DATABASE ? AS ' + schema, [os.path.join(PUSHDOWN_SQLITE, filename)])
+    return con
+
+@contextmanager
+def pushdown_connection():
+    '''Borrow a connection for pushdown queries from the pool, or the SQLite
+    stand-in connection of this thread
+    '''
+    global PUSHDOWN_POOL
+    if PUSHDOWN_SQLITE is not None:
+        if not hasattr(PUSHDOWN_LOCAL, 'con'):
+            PUSHDOWN_LOCAL.con = sqlite_connect()
+        yield PUSHDOWN_LOCAL.con
+        return
+    with PUSHDOWN_POOL_LOCK:
+        if PUSHDOWN_POOL is None:
+            # Created on first use so that each worker process has its own pool.
+            # The pool closes returned connections beyond its minimum, losing
+            # their prepared statements, so it keeps them all open.
+            database_url = os.getenv("DATABASE_URL")
+            if database_url is not None:
+                PUSHDOWN_POOL = ThreadedConnectionPool(PUSHDOWN_POOL_SIZE, PUSHDOWN_POOL_SIZE, database_url)
+            else:
+                CONFIG = configparser.ConfigParser()
+                CONFIG.read('db.cfg')
+                PUSHDOWN_POOL = ThreadedConnectionPool(PUSHDOWN_POOL_SIZE, PUSHDOWN_POOL_SIZE,
+                                                       **CONFIG['DBSETTINGS'])
+    # The pool raises an error rather than waiting when all its connections are in use
+    with PUSHDOWN_SLOTS:
+        con = PUSHDOWN_POOL.getconn()
+        con.autocommit = True
+        broken = False
+        try:
+            yield con
+        except (InterfaceError, OperationalError):
+            broken = True
+            raise
+        finally:
+            # Close broken connections for the pool to open new ones
+            PUSHDOWN_POOL.putconn(con, close=broken or bool(con.closed))
+
+# Names of the statements prepared on each pooled connection, forgotten with
+# the connection
+PREPARED_STATEMENTS = weakref.WeakKeyDictionary()
+
+def execute_pushdown(con, name, sql, params):
+    '''Run a query with parameters $1, $2... as a statement prepared once per
+    connection, returning a dataframe
+
+    SQLite already caches the statements it prepares, so the query is run as is.
+    '''
+    if isinstance(con, sqlite3.Connection):
+        cursor = con.execute(re.sub(r'\$(\d+)', r'?\1', sql), params)
+    else:
+        cursor = con.cursor()
+        prepared = PREPARED_STATEMENTS.setdefault(con, set())
+        if name not in prepared:
+            cursor.execute('PREPARE {} AS {}'.format(name, sql))
+            prepared.add(name)
+        execute = 'EXECUTE {} ({})'.format(name, ', '.join(['%s'] * len(params)))
+        try:
+            cursor.execute(execute, params)
+        except InvalidSqlStatementName:
+            # Deallocated on the server, e.g. by a connection pooler, so prepare it again
+            cursor.execute('PREPARE {} AS {}'.format(name, sql))
+            cursor.execute(execute, params)
+    df = pd.DataFrame.from_records(cursor.fetchall(), columns=[column[0] for column in cursor.description],
+                                   coerce_float=True)
+    cursor.close()
+    return pushdown_dates(df, ['date', 'first_date', 'last_date'])
+
+def pushdown_dates(df, columns):
+    '''Convert those of columns that df has to dates'''
+    for column in columns:
+        if column in df.columns:
+            # SQLite returns dates as strings
+            df[column] = pd.to_datetime(df[column]).dt.date
+    return df
+
+# Queries on the materialized views of a corridor in pushdown mode
+PUSHDOWN_QUERIES = dict(
+    most_recent='''SELECT street, direction, date, tt FROM {daily_view}
+                   WHERE period = $1 AND day_type = $2 AND direction IN ($3, $4)
+                   AND category <> 'Excluded' AND most_recent = 1''',
+    date='''SELECT street, direction, date, tt FROM {daily_view}
+            WHERE period = $1 AND day_type = $2 AND direction IN ($3, $4)
+            AND category <> 'Excluded' AND date = $5''',
+    aggregated='''SELECT street, direction, tt FROM {periods_view}
+                  WHERE period = $1 AND day_type = $2 AND direction IN ($3, $4)
+                  AND range_type = $5 AND range_id = $6''',
+    graph='''SELECT date, category, tt, most_recent, week_number, month_number,
+             rolling_7, rolling_28, above_threshold FROM {daily_view}
+             WHERE street = $1 AND direction = $2 AND day_type = $3 AND period = $4
+             AND date >= $5 AND date < $6
+             ORDER BY date''',
+    periods_for_date='''SELECT DISTINCT period FROM {daily_view} WHERE date = $1''',
+    summary='''SELECT direction, min(date) AS first_date, max(date) AS last_date, max(tt) AS max_tt
+               FROM {daily_view} WHERE date > $1 GROUP BY direction''',
+    day_total='''SELECT count(*) AS n_rows, sum(tt) AS total_tt FROM {daily_view} WHERE date = $1''',
+    heatmap_days='''SELECT street, direction, date, day_type, category, period, tt FROM {daily_view}
+                    WHERE date > $1 ORDER BY date LIMIT $2''')
+
+def pushdown_query(corridor, query, params, con=None):
+    '''Run one of the PUSHDOWN_QUERIES on the views of a corridor'''
+    sql = PUSHDOWN_QUERIES[query].format(**corridor.tables)
+    if con is not None:
+        return execute_pushdown(con, query + '_' + corridor.name, sql, params)
+    with pushdown_connection() as con:
+        return execute_pushdown(con, query + '_' + corridor.name, sql, params)
+
+@lru_cache(maxsize=PUSHDOWN_CACHE_SIZE)
+def cached_pushdown_query(corridor_name, query, params, version):
+    '''Cached results of pushdown queries, which are reused until the
+    version of the data of the corridor changes
+    '''
+    return pushdown_query(CORRIDORS[corridor_name], query, list(params))
+
+def hot_pushdown_query(corridor_name, query, params):
+    '''Run a pushdown query, reusing its result if it was run on the same
+    version of the data of the corridor. The result must not be modified.
+    '''
+    return cached_pushdown_query(corridor_name, query, tuple(params), get_corridor_data(corridor_name).version)
+
+# Each corridor (project) monitored by the dashboard: its streets grouped by
+# "orientation" (one tab each), the directions for each orientation, the cap on
+# the y axis of the graphs for each orientation and the tables its data is in
+Corridor = namedtuple('Corridor', ['name', 'title', 'tables', 'tab_labels',
+                                   'streets', 'directions', 'max_time'])
+
+# Tables each corridor reads from and their default names within its schema
+CORRIDOR_TABLES = OrderedDict(daily='dash_daily',
+                              baseline='dash_baseline',
+                              weeks='pilot_weeks',
+                              months='pilot_months',
+                              bins='dash_bins',
+                              daily_view='dash_daily_mv',
+                              periods_view='dash_periods_mv',
+                              baseline_view='dash_baseline_mv')
+
+def split_list(value):
+    '''Split a comma separated config value into a list'''
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+def corridor_from_config(name, section):
+    '''Create a Corridor from its section of the corridors config file'''
+    schema = section.get('schema', name)
+    orientations = split_list(section['orientations'])
+    return Corridor(name=name,
+                    title=section['title'],
+                    tables={table: schema + '.' + section.get(table + '_table', default)
+                            for table, default in CORRIDOR_TABLES.items()},
+                    tab_labels=OrderedDict((orientation, section['label_' + orientation])
+                                           for orientation in orientations),
+                    streets=OrderedDict((orientation, split_list(section['streets_' + orientation]))
+                                        for orientation in orientations),
+                    directions=OrderedDict((orientation, split_list(section['directions_' + orientation]))
+                                           for orientation in orientations),
+                    max_time={orientation: section.getfloat('max_time_' + orientation)
+                              for orientation in orientations})
+
+def corridors_from_table(registry_table):
+    '''Create Corridors from a registry table in the database, which has one
+    row per orientation of each corridor
+    '''
+    con = db_connect()
+    registry = pandasql.read_sql('''SELECT * FROM {} ORDER BY corridor, sort_order
+                                 '''.format(registry_table), con)
+    con.close()
+    corridors = OrderedDict()
+    for name, rows in registry.groupby('corridor', sort=False):
+        schema = rows['schema'].iloc[0]
+        tables = {}
+        for table, default in CORRIDOR_TABLES.items():
+            column = table + '_table'
+            if column in rows.columns and rows[column].iloc[0]:
+                tables[table] = schema + '.' + rows[column].iloc[0]
+            else:
+                tables[table] = schema + '.' + default
+        corridors[name] = Corridor(name=name,
+                                   title=rows['title'].iloc[0],
+                                   tables=tables,
+                                   tab_labels=OrderedDict(zip(rows['orientation'], rows['tab_label'])),
+                                   streets=OrderedDict(zip(rows['orientation'], rows['streets'])),
+                                   directions=OrderedDict(zip(rows['orientation'], rows['directions'])),
+                                   max_time=dict(zip(rows['orientation'], rows['max_time'].astype(float))))
+    return corridors
+
+def load_corridor_registry():
+    '''Load the corridors to monitor from the table named by CORRIDOR_TABLE if
+    it is set, otherwise from corridors.cfg
+    '''
+    registry_table = os.getenv('CORRIDOR_TABLE')
+    if registry_table is not None:
+        return corridors_from_table(registry_table)
+    CONFIG = configparser.ConfigParser()
+    CONFIG.read(os.getenv('CORRIDOR_CONFIG', 'corridors.cfg'))
+    return OrderedDict((name, corridor_from_config(name, CONFIG[name]))
+                       for name in CONFIG.sections())
+
+CORRIDORS = load_corridor_registry()
+DEFAULT_CORRIDOR = os.getenv('DEFAULT_CORRIDOR', next(iter(CORRIDORS)))
+
+def round_tt(values):
+    '''Round travel times to 0.1 minutes as the database does, halves away
+    from zero, rather than halves to even as numpy does, allowing for the error
+    of float sums of values already rounded to 0.1
+    '''
+    return np.sign(values) * np.floor(np.abs(values) * 10 + 0.5 + 1e-6) / 10
+
+def add_rolling_stats(data, baseline):
+    '''Add the rolling means of travel time over each of ROLLING_WINDOWS days,
+    and whether the travel time is more than THRESHOLD above the baseline, to
+    each day of the daily data
+
+    Rolling means are computed separately for each category of days of each
+    (street, direction, day_type, period) series, with one pass of cumulative
+    sums over the date sorted data rather than a rolling window per series.
+    '''
+    data = data.sort_values(SERIES_KEYS + ['category', 'date']).reset_index(drop=True)
+    series = data.groupby(SERIES_KEYS + ['category'], sort=False).ngroup().values
+    days = data['date'].values.astype('datetime64[D]').astype(np.int64)
+    days = days - days.min()
+    # Place each series on its own stretch of one axis, far enough apart that
+    # no window spans two series
+    position = series * (days.max() + max(ROLLING_WINDOWS) + 1) + days
+
+    valid = (data['category'] != 'Excluded').values & data['tt'].notnull().values
+    tt_sums = np.concatenate([[0], np.cumsum(np.where(valid, data['tt'].values, 0))])
+    tt_counts = np.concatenate([[0], np.cumsum(valid)])
+    ends = np.arange(1, len(data) + 1)
+    for window in ROLLING_WINDOWS:
+        starts = np.searchsorted(position, position - (window - 1), side='left')
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = (tt_sums[ends] - tt_sums[starts]) / (tt_counts[ends] - tt_counts[starts])
+        data['rolling_' + str(window)] = round_tt(means)
+
+    baseline_tt = data[SERIES_KEYS].merge(baseline[SERIES_KEYS + ['tt']], how='left', on=SERIES_KEYS)['tt']
+    data['above_threshold'] = round_tt((data['tt'] - baseline_tt.values).values) > THRESHOLD
+    return data
+
+def add_percentile_bands(data, baseline):
+    '''Add the PERCENTILE_BAND of the daily travel times from before the pilot
+    to the baseline of each series
+    '''
+    grouped = data[data['category'] == 'Baseline'].groupby(SERIES_KEYS)['tt']
+    bands = round_tt(pd.DataFrame({'tt_low': grouped.quantile(PERCENTILE_BAND[0] / 100),
+                                   'tt_high': grouped.quantile(PERCENTILE_BAND[1] / 100)}))
+    return baseline.merge(bands, how='left', left_on=SERIES_KEYS, right_index=True)
+
+def copy_days(days, kept, n_days, axis, max_days=None):
+    '''Copy the kept slice of the days of an array, along axis, to the start of
+    a new array with room for n_days days, and at most max_days
+    '''
+    capacity = days.shape[axis]
+    if n_days > capacity:
+        # Double the capacity so that each day is copied a constant number of times on average
+        capacity = max(n_days, 2 * capacity)
+    if max_days is not None:
+        capacity = min(capacity, max_days)
+    before = (slice(None),) * axis
+    copied = np.full(days.shape[:axis] + (capacity,) + days.shape[axis + 1:], nan, dtype=days.dtype)
+    kept = days[before + (kept,)]
+    copied[before + (slice(0, kept.shape[axis]),)] = kept
+    return copied
+
+# Difference between the daily and baseline travel times of every street
+# direction of a corridor (rows) on each day from start (columns), with a matrix
+# for each (day_type, period) group. Columns from n_days on are spare capacity
+# for days loaded later, so that only new days have to be written.
+Heatmap = namedtuple('Heatmap', ['rows', 'groups', 'start', 'n_days', 'diffs'])
+
+def corridor_rows(corridor):
+    '''Every (street, direction) of a corridor, in display order'''
+    return [(street, direction) for orientation in corridor.streets
+            for street in corridor.streets[orientation]
+            for direction in corridor.directions[orientation]]
+
+def create_heatmap(corridor, baseline, start):
+    '''Create an empty heatmap for the street directions of a corridor and
+    the day types and periods of its baseline
+    '''
+    rows = corridor_rows(corridor)
+    groups = baseline[['day_type', 'period']].drop_duplicates().sort_values(['day_type', 'period'])
+    return Heatmap(rows=rows,
+                   groups=OrderedDict((group, i) for i, group in enumerate(groups.itertuples(index=False, name=None))),
+                   start=np.datetime64(start, 'D'),
+                   n_days=0,
+                   diffs=np.full((len(groups), len(rows), 0), nan, dtype=np.float32))
+
+def extend_heatmap(heatmap, days, baseline):
+    '''Write the difference from the baseline of days from the last day of the
+    heatmap into it, growing its capacity if necessary
+
+    Days after the last day of the heatmap are written into the unused
+    capacity of its matrices, which heatmaps sharing them don't read. Writing
+    the last day again, for rows synced after it was loaded, copies the
+    matrices first so that the heatmaps of older snapshots are unaffected.
+    '''
+    days = days[days['category'] != 'Excluded']
+    if days.empty:
+        return heatmap
+    day_index = (days['date'].values.astype('datetime64[D]') - heatmap.start).astype(np.int64)
+    n_days = max(heatmap.n_days, day_index.max() + 1)
+    diffs = heatmap.diffs
+    if n_days > diffs.shape[2] or day_index.min() < heatmap.n_days:
+        diffs = copy_days(diffs, slice(0, heatmap.n_days), n_days, axis=2)
+
+    row_lookup = pd.Series(np.arange(len(heatmap.rows)), index=pd.MultiIndex.from_tuples(heatmap.rows))
+    group_lookup = pd.Series(list(heatmap.groups.values()), index=pd.MultiIndex.from_tuples(list(heatmap.groups)))
+    rows = row_lookup.reindex(pd.MultiIndex.from_arrays([days['street'], days['direction']])).values
+    groups = group_lookup.reindex(pd.MultiIndex.from_arrays([days['day_type'], days['period']])).values
+    baseline_tt = days[SERIES_KEYS].merge(baseline[SERIES_KEYS + ['tt']], how='left', on=SERIES_KEYS)['tt'].values
+    # Ignore streets and periods the corridor doesn't display
+    keep = ~np.isnan(rows) & ~np.isnan(groups)
+    diffs[groups[keep].astype(np.int64),
+          rows[keep].astype(np.int64),
+          day_index[keep]] = days['tt'].values[keep] - baseline_tt[keep]
+    return heatmap._replace(n_days=n_days, diffs=diffs)
+
+# Data loaded for a corridor and the values derived from it
+CorridorData = namedtuple('CorridorData', ['data', 'baseline', 'weeks', 'months', 'ranges',
+                                           'daterange', 'timeperiods', 'max_time', 'heatmap',
+                                           'summary', 'version', 'loaded_at', 'nbytes'])
+
+def day_version(day, n_rows, total_tt):
+    '''Version of the data of a corridor whose last day is day, which changes
+    when days are added or rows of the last day are added or corrected
+    '''
+    return '{} {} {:.1f}'.format(day, int(n_rows), total_tt or 0)
+
+def daily_version(data):
+    '''day_version of daily travel times'''
+    last_day = data['date'].max()
+    tt = data.loc[data['date'] == last_day, 'tt']
+    return day_version(last_day, len(tt), tt.sum())
+
+def read_daily(corridor, con, since=date.min):
+    '''Fetch the daily travel times of a corridor after the since date'''
+    return pandasql.read_sql('''
+                             SELECT street, direction, dt AS date, day_type, category, period, round(tt,1) tt, 
+                             CASE WHEN dt = first_value(dt) OVER (PARTITION BY direction, day_type, period ORDER BY dt DESC)
+                             THEN 1 ELSE 0 END AS most_recent,
+                             week_number, month_number 
+                             FROM {daily}
+                             LEFT OUTER JOIN {weeks} weeks ON dt >= week AND dt < week + INTERVAL '1 week'
+                             LEFT OUTER JOIN {months} months ON dt >= month AND dt < month + INTERVAL '1 month'
+                             WHERE dt > %(since)s
+                             '''.format(**corridor.tables), con, params={'since': since})
+
+def read_weeks_months(corridor, con):
+    '''Fetch the numbered weeks and months of a corridor for dropdown selectors'''
+    weeks = pandasql.read_sql('''SELECT * FROM {weeks} 
+                              '''.format(**corridor.tables), con)
+    months = pandasql.read_sql('''SELECT * FROM {months}
+                               '''.format(**corridor.tables), con, parse_dates=['month'])
+    weeks['label'] = 'Week ' + weeks['week_number'].astype(str) + ': ' + weeks['week'].astype(str)
+    weeks.sort_values(by='week_number', inplace=True)
+    months['label'] = 'Month ' + months['month_number'].astype(str) + ': ' + months['month'].dt.strftime("%b '%y")
+    return weeks, months
+
+def summarize_daily(data):
+    '''First and last dates and the max travel time of each direction'''
+    grouped = data.groupby('direction')
+    return pd.DataFrame({'first_date': grouped['date'].min(),
+                         'last_date': grouped['date'].max(),
+                         'max_tt': grouped['tt'].max()})
+
+def derive_corridor_data(corridor, data, baseline, weeks, months, heatmap, summary, version):
+    '''Derive the date ranges and time periods to select from and the graph
+    bounds of a corridor from its data and the summary of its directions
+    '''
+    #Max travel time to fix y axis of graphs, based on the lowest of the max tt in the data or the cap for each tab
+    max_time = {orientation: min(corridor.max_time[orientation],
+                                 summary['max_tt'].reindex(corridor.directions[orientation]).max())
+                for orientation in corridor.streets}
+
+    return CorridorData(data=data,
+                        baseline=baseline,
+                        weeks=weeks,
+                        months=months,
+                        #Range types: Latest Day, Select Date, WEEKS, MONTHS, Full History
+                        ranges=[pd.DataFrame(), pd.DataFrame(), weeks, months, pd.DataFrame()],
+                        daterange=[summary['first_date'].min(), summary['last_date'].max()],
+                        #Time periods for each day type, derived from the baseline dataframe
+                        timeperiods=baseline[['day_type','period','period_range']].drop_duplicates().sort_values(['day_type', 'period_range']),
+                        max_time=max_time,
+                        heatmap=heatmap,
+                        summary=summary,
+                        version=version,
+                        loaded_at=time.time(),
+                        nbytes=(sum(df.memory_usage(deep=True).sum() for df in [data, baseline, weeks, months])
+                                + heatmap.diffs.nbytes))
+
+def load_corridor_data(corridor):
+    '''Fetch the daily and baseline travel times for a corridor, and derive the
+    date ranges and time periods to select from
+    '''
+    LOGGER.info('Loading data for corridor %s', corridor.name)
+    con = db_connect()
+    data = read_daily(corridor, con)
+    baseline = pandasql.read_sql('''SELECT street, direction, from_intersection, to_intersection, 
+                                 day_type, period, period_range, round(tt,1) tt 
+                                 FROM {baseline} '''.format(**corridor.tables),
+                                 con)
+    weeks, months = read_weeks_months(corridor, con)
+    con.close()
+    # Statistics for the graph overlays, computed once per load
+    data = add_rolling_stats(data, baseline)
+    baseline = add_percentile_bands(data, baseline)
+    heatmap = extend_heatmap(create_heatmap(corridor, baseline, data['date'].min()), data, baseline)
+    return derive_corridor_data(corridor, data, baseline, weeks, months, heatmap, summarize_daily(data),
+                                daily_version(data))
+
+def refresh_corridor_data(corridor, corridor_data):
+    '''Fetch the days added since the data for a corridor was loaded, and the
+    last day loaded again for rows synced after it was loaded, and add them to
+    its data and heatmap
+    '''
+    last_day = corridor_data.daterange[1]
+    con = db_connect()
+    new_days = read_daily(corridor, con, since=last_day - relativedelta(days=1))
+    version = daily_version(new_days)
+    if version == corridor_data.version:
+        # Neither new days nor new or corrected rows for the last day
+        con.close()
+        return corridor_data._replace(loaded_at=time.time())
+    LOGGER.info('Refreshing days from %s of corridor %s', last_day, corridor.name)
+    old_days = corridor_data.data['date'] < last_day
+    weeks, months = read_weeks_months(corridor, con)
+    con.close()
+    data = pd.concat([corridor_data.data.loc[old_days, new_days.columns], new_days], ignore_index=True)
+    # The most recent days of every series may have changed
+    data['most_recent'] = (data['date'] == data.groupby(['direction', 'day_type', 'period'])['date'].transform('max')).astype(int)
+    data = add_rolling_stats(data, corridor_data.baseline)
+    heatmap = extend_heatmap(corridor_data.heatmap, new_days, corridor_data.baseline)
+    return derive_corridor_data(corridor, data, corridor_data.baseline, weeks, months, heatmap,
+                                summarize_daily(data), version)
+
+# Columns of the daily data, which is left empty in pushdown mode
+DAILY_COLUMNS = ['street', 'direction', 'date', 'day_type', 'category', 'period', 'tt', 'most_recent',
+                 'week_number', 'month_number', 'rolling_7', 'rolling_28', 'above_threshold']
+
+def read_pushdown_weeks_months(corridor, con):
+    '''Fetch the numbered weeks and months of a corridor from the pushdown database'''
+    weeks, months = read_weeks_months(corridor, con)
+    return pushdown_dates(weeks, ['week']), months
+
+def pushdown_version(corridor, con, last_day):
+    '''day_version of the views of a corridor whose last day is last_day'''
+    day = pushdown_query(corridor, 'day_total', [last_day], con).iloc[0]
+    return day_version(last_day, day['n_rows'], day['total_tt'])
+
+def extend_heatmap_from_views(corridor, con, heatmap, baseline, since):
+    '''Write the days after since from the views of a corridor into its
+    heatmap, fetching PUSHDOWN_CHUNK_ROWS rows at a time
+    '''
+    while True:
+        days = pushdown_query(corridor, 'heatmap_days', [since, PUSHDOWN_CHUNK_ROWS], con)
+        complete = len(days) < PUSHDOWN_CHUNK_ROWS
+        if not complete:
+            # The last day may continue in the next chunk, so leave it for then
+            days = days[days['date'] < days['date'].iloc[-1]]
+        heatmap = extend_heatmap(heatmap, days, baseline)
+        if complete or days.empty:
+            return heatmap
+        since = days['date'].iloc[-1]
+
+def load_pushdown_corridor_data(corridor):
+    '''Fetch what the pushdown queries don't cover for a corridor: its
+    baseline, weeks and months, a summary of its directions and its heatmap
+    '''
+    LOGGER.info('Loading pushdown data for corridor %s', corridor.name)
+    with pushdown_connection() as con:
+        baseline = pandasql.read_sql('''SELECT street, direction, from_intersection, to_intersection,
+                                     day_type, period, period_range, tt, tt_low, tt_high
+                                     FROM {baseline_view} '''.format(**corridor.tables), con)
+        weeks, months = read_pushdown_weeks_months(corridor, con)
+        summary = pushdown_query(corridor, 'summary', [date.min], con).set_index('direction')
+        version = pushdown_version(corridor, con, summary['last_date'].max())
+        heatmap = extend_heatmap_from_views(corridor, con,
+                                            create_heatmap(corridor, baseline, summary['first_date'].min()),
+                                            baseline, date.min)
+    return derive_corridor_data(corridor, pd.DataFrame(columns=DAILY_COLUMNS), baseline, weeks, months,
+                                heatmap, summary, version)
+
+def refresh_pushdown_corridor_data(corridor, corridor_data):
+    '''Add the days added to the views since the data for a corridor was
+    loaded, and the last day loaded again for rows synced after it was
+    loaded, to its heatmap and summary
+    '''
+    since = corridor_data.daterange[1] - relativedelta(days=1)
+    with pushdown_connection() as con:
+        new_summary = pushdown_query(corridor, 'summary', [since], con).set_index('direction')
+        version = pushdown_version(corridor, con, new_summary['last_date'].max())
+        if version == corridor_data.version:
+            # Neither new days nor new or corrected rows for the last day
+            return corridor_data._replace(loaded_at=time.time())
+        LOGGER.info('Refreshing days from %s of corridor %s', corridor_data.daterange[1], corridor.name)
+        weeks, months = read_pushdown_weeks_months(corridor, con)
+        heatmap = extend_heatmap_from_views(corridor, con, corridor_data.heatmap, corridor_data.baseline, since)
+    grouped = pd.concat([corridor_data.summary, new_summary]).groupby(level=0)
+    summary = pd.DataFrame({'first_date': grouped['first_date'].min(),
+                            'last_date': grouped['last_date'].max(),
+                            'max_tt': grouped['max_tt'].max()})
+    return derive_corridor_data(corridor, corridor_data.data, corridor_data.baseline, weeks, months,
+                                heatmap, summary, version)
+
+# Loaded corridors, ordered from least to most recently used
+CORRIDOR_CACHE = OrderedDict()
+# Memory budget for loaded corridors, beyond which the least recently used
+# corridors are dropped and reloaded on their next access
+CORRIDOR_CACHE_BYTES = float(os.getenv('CORRIDOR_CACHE_MB', 512)) * 1024 ** 2
+# How often to check for new days of data for a loaded corridor
+CORRIDOR_REFRESH_SECONDS = float(os.getenv('CORRIDOR_REFRESH_MINUTES', 30)) * 60
+
+# Guards the contents and order of CORRIDOR_CACHE and SUBDAILY_CACHE
+CACHE_LOCK = threading.Lock()
+# Held while loading or refreshing a corridor, so that each is only loaded or
+# refreshed by one thread at a time
+CORRIDOR_LOCKS = {}
+
+def get_snapshot(cache, locks, corridor, load, refresh, evict):
+    '''Return the snapshot of a corridor from a cache, loading it with load()
+    on first access and replacing it with refresh(snapshot) every
+    CORRIDOR_REFRESH_SECONDS, then evicting with evict()
+
+    Snapshots are never modified once created, so threads can keep using the
+    one they got while another thread refreshes the corridor. Threads finding a
+    refresh in progress use the current snapshot rather than waiting for it.
+    '''
+    with CACHE_LOCK:
+        snapshot = cache.get(corridor)
+        if snapshot is not None:
+            cache.move_to_end(corridor)
+        lock = locks.setdefault(corridor, threading.Lock())
+    if snapshot is None:
+        lock.acquire()
+    elif time.time() - snapshot.loaded_at > CORRIDOR_REFRESH_SECONDS:
+        if not lock.acquire(blocking=False):
+            return snapshot
+    else:
+        return snapshot
+    try:
+        # Another thread may have loaded or refreshed the corridor meanwhile
+        with CACHE_LOCK:
+            snapshot = cache.get(corridor)
+        if snapshot is None:
+            snapshot = load()
+        elif time.time() - snapshot.loaded_at > CORRIDOR_REFRESH_SECONDS:
+            snapshot = refresh(snapshot)
+        else:
+            return snapshot
+        with CACHE_LOCK:
+            cache[corridor] = snapshot
+            cache.move_to_end(corridor)
+            evict()
+        return snapshot
+    finally:
+        lock.release()
+
+def request_snapshot(name, corridor, get):
+    '''Return the snapshot returned by get() for a corridor, reusing it for the
+    rest of the request if called while handling one, so that each callback
+    sees the same data throughout even if the corridor is refreshed meanwhile
+    '''
+    if not has_request_context():
+        return get()
+    snapshots = g.setdefault(name, {})
+    if corridor not in snapshots:
+        snapshots[corridor] = get()
+    return snapshots[corridor]
+
+def get_corridor_data(corridor=DEFAULT_CORRIDOR):
+    '''Return the data for a corridor, loading it on first access and adding
+    new days to it every CORRIDOR_REFRESH_SECONDS
+    '''
+    if DATA_BACKEND == 'pushdown':
+        load, refresh = load_pushdown_corridor_data, refresh_pushdown_corridor_data
+    else:
+        load, refresh = load_corridor_data, refresh_corridor_data
+    return request_snapshot('corridor_data', corridor,
+                            lambda: get_snapshot(CORRIDOR_CACHE, CORRIDOR_LOCKS, corridor,
+                                                 lambda: load(CORRIDORS[corridor]),
+                                                 lambda corridor_data: refresh(CORRIDORS[corridor], corridor_data),
+                                                 evict_corridors))
+
+def evict_corridors():
+    '''Drop the least recently used corridors until the loaded data fits in
+    CORRIDOR_CACHE_BYTES, always keeping the most recently used one. Must be
+    called holding CACHE_LOCK.
+    '''
+    while (len(CORRIDOR_CACHE) > 1 and
+           sum(loaded.nbytes for loaded in CORRIDOR_CACHE.values()) > CORRIDOR_CACHE_BYTES):
+        corridor, evicted = CORRIDOR_CACHE.popitem(last=False)
+        LOGGER.info('Evicting corridor %s, freeing %.1f MB', corridor, evicted.nbytes / 1024 ** 2)
+
+# Sub-daily travel times of every street direction of a corridor (rows) in bins
+# of BIN_MINUTES, with an array of shape (days, rows, bins per day) from start.
+# Days from n_days on are spare capacity, as for the heatmap.
+SubDaily = namedtuple('SubDaily', ['rows', 'start', 'n_days', 'tt', 'loaded_at'])
+
+# Width of the bins in the sub-daily table, in minutes
+BIN_MINUTES = int(os.getenv('BIN_MINUTES', 15))
+BINS_PER_DAY = 24 * 60 // BIN_MINUTES
+# Half precision is enough for travel times to the tenth of a minute, and
+# halves the memory taken by the 50-100 times more values than daily data
+BIN_DTYPE = np.float16
+# Memory budget for the sub-daily bins of all loaded corridors. Only the most
+# recent days fitting in it are kept for each corridor.
+SUBDAILY_CACHE_BYTES = float(os.getenv('SUBDAILY_CACHE_MB', 128)) * 1024 ** 2
+# Rows to fetch at a time when loading sub-daily bins
+SUBDAILY_CHUNK_ROWS = 200000
+
+# Loaded sub-daily bins, ordered from least to most recently used corridor
+SUBDAILY_CACHE = OrderedDict()
+
+def subdaily_max_days(rows):
+    '''Most days of bins for the street directions rows fitting in SUBDAILY_CACHE_BYTES'''
+    return max(1, int(SUBDAILY_CACHE_BYTES // (len(rows) * BINS_PER_DAY * np.dtype(BIN_DTYPE).itemsize)))
+
+def read_bins(corridor, con, since):
+    '''Fetch the sub-daily travel times of a corridor after the since date,
+    SUBDAILY_CHUNK_ROWS rows at a time
+
+    A server side cursor is used so that the rows aren't all held in memory
+    before they are written to the array.
+    '''
+    cursor = con.cursor(name='bins_' + corridor.name)
+    cursor.execute('''SELECT street, direction, dt,
+                      (EXTRACT(HOUR FROM time_bin) * 60 + EXTRACT(MINUTE FROM time_bin))::int,
+                      round(tt, 1)
+                      FROM {bins}
+                      WHERE dt > %(since)s
+                      ORDER BY dt'''.format(**corridor.tables), {'since': since})
+    while True:
+        rows = cursor.fetchmany(SUBDAILY_CHUNK_ROWS)
+        if not rows:
+            break
+        yield pd.DataFrame.from_records(rows, columns=['street', 'direction', 'date', 'minute', 'tt'],
+                                        coerce_float=True)
+    cursor.close()
+
+def extend_subdaily(subdaily, bins, max_days):
+    '''Write the bins of days after the last day of subdaily into it, growing
+    its capacity if necessary and dropping its oldest days beyond max_days
+
+    As for the heatmap, days already in the array are never written to.
+    '''
+    if bins.empty:
+        return subdaily
+    dates = bins['date'].values.astype('datetime64[D]')
+    if subdaily.n_days == 0:
+        # Start from the first day with data rather than the start of the budget
+        subdaily = subdaily._replace(start=dates.min())
+    day_index = (dates - subdaily.start).astype(np.int64)
+    n_days = max(subdaily.n_days, day_index.max() + 1)
+    dropped = max(0, n_days - max_days)
+    start, tt = subdaily.start + dropped, subdaily.tt
+    if dropped or n_days > tt.shape[0]:
+        tt = copy_days(tt, slice(dropped, subdaily.n_days), n_days - dropped, axis=0, max_days=max_days)
+    day_index -= dropped
+
+    row_lookup = pd.Series(np.arange(len(subdaily.rows)), index=pd.MultiIndex.from_tuples(subdaily.rows))
+    rows = row_lookup.reindex(pd.MultiIndex.from_arrays([bins['street'], bins['direction']])).values
+    bin_index = bins['minute'].values // BIN_MINUTES
+    # Ignore streets the corridor doesn't display and days before the kept ones
+    keep = ~np.isnan(rows) & (day_index >= 0) & (bin_index >= 0) & (bin_index < BINS_PER_DAY)
+    tt[day_index[keep], rows[keep].astype(np.int64), bin_index[keep]] = bins['tt'].values[keep]
+    return subdaily._replace(start=start, n_days=n_days - dropped, tt=tt)
+
+def load_bins(corridor, subdaily, since):
+    '''Add the bins of a corridor after the since date to subdaily, chunk by
+    chunk, keeping those added so far if the database can't be read
+    '''
+    max_days = subdaily_max_days(subdaily.rows)
+    if PUSHDOWN_SQLITE is not None:
+        # The SQLite stand-in is used in place of the database, and has no bins
+        return subdaily._replace(loaded_at=time.time())
+    con = None
+    try:
+        con = db_connect()
+        for bins in read_bins(corridor, con, since):
+            subdaily = extend_subdaily(subdaily, bins, max_days)
+    except PostgresError as error:
+        # No bins table, or the database can't be reached: the drill-down
+        # then shows no data
+        LOGGER.warning('No sub-daily data for corridor %s in %s: %s', corridor.name, corridor.tables['bins'],
+                       str(error).strip())
+    finally:
+        if con is not None:
+            con.close()
+    return subdaily._replace(loaded_at=time.time())
+
+# Held while loading or refreshing the sub-daily bins of a corridor
+SUBDAILY_LOCKS = {}
+
+def load_subdaily(corridor):
+    '''Load the sub-daily bins of the most recent days of a corridor fitting in
+    SUBDAILY_CACHE_BYTES
+    '''
+    rows = corridor_rows(corridor)
+    daterange = get_corridor_data(corridor.name).daterange
+    since = max(daterange[1] - relativedelta(days=subdaily_max_days(rows)), daterange[0] - relativedelta(days=1))
+    LOGGER.info('Loading sub-daily data after %s for corridor %s', since, corridor.name)
+    return load_bins(corridor,
+                     SubDaily(rows=rows,
+                              start=np.datetime64(since, 'D') + 1,
+                              n_days=0,
+                              tt=np.full((0, len(rows), BINS_PER_DAY), nan, dtype=BIN_DTYPE),
+                              loaded_at=time.time()),
+                     since)
+
+def refresh_subdaily(corridor, subdaily):
+    '''Add the bins of the days after the last loaded day of a corridor'''
+    # The day before start if no days were loaded
+    last_day = (subdaily.start + subdaily.n_days - 1).astype(object)
+    return load_bins(corridor, subdaily, last_day)
+
+def get_subdaily(corridor=DEFAULT_CORRIDOR):
+    '''Return the sub-daily bins of a corridor, loading them on first access
+    and adding new days every CORRIDOR_REFRESH_SECONDS
+    '''
+    return request_snapshot('subdaily', corridor,
+                            lambda: get_snapshot(SUBDAILY_CACHE, SUBDAILY_LOCKS, corridor,
+                                                 lambda: load_subdaily(CORRIDORS[corridor]),
+                                                 lambda subdaily: refresh_subdaily(CORRIDORS[corridor], subdaily),
+                                                 evict_subdaily))
+
+def evict_subdaily():
+    '''Drop the sub-daily bins of the least recently used corridors until
+    they fit in SUBDAILY_CACHE_BYTES, always keeping the most recently used
+    one. Must be called holding CACHE_LOCK.
+    '''
+    while (len(SUBDAILY_CACHE) > 1 and
+           sum(loaded.tt.nbytes for loaded in SUBDAILY_CACHE.values()) > SUBDAILY_CACHE_BYTES):
+        corridor, evicted = SUBDAILY_CACHE.popitem(last=False)
+        LOGGER.info('Evicting sub-daily data of corridor %s, freeing %.1f MB', corridor,
+                    evicted.tt.nbytes / 1024 ** 2)
 
 ###################################################################################################
 #                                                                                                 #
@@ -66,30 +818,40 @@ con.close()
 #                                                                                                 #
 ###################################################################################################
 
-TITLE = 'King Street Transit Pilot: Vehicular Travel Time Monitoring'
+TITLE = CORRIDORS[DEFAULT_CORRIDOR].title
 
 # Data management constants
 
-# Hard coded ordering of street names for displaying in the data table for each 
-# tab by the "orientation" of those streets. E.g. 'ew' for East-West
-STREETS = OrderedDict(ew=['Dundas', 'Queen', 'Richmond', 'Adelaide', 'Wellington', 'Front'],
-                      ns=['Bathurst', 'Spadina', 'University', 'Yonge', 'Jarvis'])
-# Directions assigned to each tab
-DIRECTIONS = OrderedDict(ew=['Eastbound', 'Westbound'],
-                         ns=['Northbound', 'Southbound'])
-
-DATERANGE = [DATA['date'].min(), DATA['date'].max()]
-
-#Time periods for each day type, derived from the baseline dataframe
-TIMEPERIODS = BASELINE[['day_type','period','period_range']].drop_duplicates().sort_values(['day_type', 'period_range'])
+# Orientations of streets across all corridors, each displayed in its own tab
+ORIENTATIONS = list(OrderedDict.fromkeys(orientation for corridor in CORRIDORS.values()
+                                         for orientation in corridor.streets))
 
 # Threshold for changing the colour of cells in the table based on difference 
 # from the baseline in minutes
 THRESHOLD = 1
 
-#Max travel time to fix y axis of graphs, based on the lowest of the max tt in the data or 20/30 for either tab
-MAX_TIME = dict(ew=min(30, DATA[DATA['direction'].isin(DIRECTIONS['ew'])].tt.max()),
-                ns=min(20, DATA[DATA['direction'].isin(DIRECTIONS['ns'])].tt.max())) 
+# Columns identifying each series of daily travel times
+SERIES_KEYS = ['street', 'direction', 'day_type', 'period']
+
+# Rolling means of travel time, in days, to overlay on the graphs
+ROLLING_WINDOWS = [7, 28]
+
+# Percentiles of travel times before the pilot to overlay as a band around the baseline
+PERCENTILE_BAND = (15, 85)
+
+# Days displayed in the heatmap by default
+HEATMAP_DAYS = 56
+# Difference from baseline, in minutes, at which heatmap colours are darkest
+HEATMAP_RANGE = 5
+
+# Most bars to graph for each category of a series when displaying its full
+# history, beyond which days are averaged by week or month
+MAX_GRAPH_POINTS = 100
+
+# Resolutions, in minutes, to which the sub-daily bins of a day can be resampled
+DRILLDOWN_RESOLUTIONS = OrderedDict((minutes, label) for minutes, label
+                                    in [(BIN_MINUTES, str(BIN_MINUTES) + ' min'), (60, 'Hourly')]
+                                    if minutes % BIN_MINUTES == 0)
 
 # Plot appearance
 BASELINE_LINE = {'color': 'rgba(128, 128, 128, 0.7)',
@@ -97,7 +859,19 @@ BASELINE_LINE = {'color': 'rgba(128, 128, 128, 0.7)',
 PLOT = dict(margin={'t':10, 'b': 40, 'r': 40, 'l': 40, 'pad': 8})
 PLOT_COLORS = dict(pilot='rgba(22, 87, 136, 100)',
                    baseline='rgba(128, 128, 128, 1.0)',
-                   selected='rgba(135, 71, 22, 1.0)')
+                   selected='rgba(135, 71, 22, 1.0)',
+                   rolling_7='rgba(233, 163, 201, 1.0)',
+                   rolling_28='rgba(197, 27, 125, 1.0)',
+                   band='rgba(128, 128, 128, 0.2)',
+                   above_threshold='rgba(197, 27, 125, 1.0)')
+# Colours of the sub-daily travel times of each direction in the drill-down graph
+DRILLDOWN_COLORS = ['rgba(22, 87, 136, 1.0)', 'rgba(135, 71, 22, 1.0)']
+# Diverging colours of the heatmap, matching the better/worse colours of the table
+HEATMAP_COLORS = [[0, '#4D9221'], [0.3, '#A1D76A'], [0.5, '#F7F7F7'], [0.7, '#E9A3C9'], [1, '#C51B7D']]
+# Optional overlays on the graphs
+OVERLAYS = OrderedDict([('rolling_' + str(window), str(window) + '-day average') for window in ROLLING_WINDOWS] +
+                       [('band', 'Baseline {}-{}th percentile'.format(*PERCENTILE_BAND)),
+                        ('above_threshold', 'Days ' + str(THRESHOLD) + '+ min longer than baseline')])
 FONT_FAMILY = '"Open Sans", "HelveticaNeue", "Helvetica Neue", Helvetica, Arial, sans-serif'
 
 # IDs for divs
@@ -105,9 +879,12 @@ FONT_FAMILY = '"Open Sans", "HelveticaNeue", "Helvetica Neue", Helvetica, Arial,
 # linter will scream if a variable isn't defined
 MAIN_DIV = 'main-page'
 STREETNAME_DIV = ['street-name-'+str(i) for i in [0, 1]]
-SELECTED_STREET_DIVS = OrderedDict([(orientation, 'selected-street' + orientation) for orientation in STREETS])
+SELECTED_STREET_DIVS = OrderedDict([((corridor, orientation), 'selected-street-' + corridor + '-' + orientation)
+                                    for corridor in CORRIDORS for orientation in CORRIDORS[corridor].streets])
 TABLE_DIV_ID = 'div-table'
+TABLE_ID = 'data_table'
 TIMEPERIOD_DIV = 'timeperiod'
+CORRIDOR_DROPDOWN = 'corridor-dropdown'
 CONTROLS = dict(div_id='controls-div',
                 toggle='toggle-controls-button',
                 timeperiods='timeperiod-radio',
@@ -116,15 +893,40 @@ CONTROLS = dict(div_id='controls-div',
                 date_range='date-range-dropbown',
                 date_range_span='date-range-span',
                 date_picker='date-picker-div',
-                date_picker_span='date-picker-span')
-DATERANGE_TYPES = ['Last Day', 'Select Date', 'Select Week', 'Select Month']
+                date_picker_span='date-picker-span',
+                overlays='overlays-checklist')
+DATERANGE_TYPES = ['Last Day', 'Select Date', 'Select Week', 'Select Month', 'Full History']
 GRAPHS = ['eb_graph', 'wb_graph']
 GRAPHDIVS = ['eb_graph_div', 'wb_graph_div']
 
-LAYOUTS = dict(streets='streets-div')
+HEATMAP = dict(day_types='heatmap-day-type-radio',
+               timeperiods='heatmap-timeperiod-radio',
+               date_range='heatmap-date-range',
+               graph='heatmap-graph')
 
-# Default selected streets for each tab
-INITIAL_STATE = {orientation:STREETS[orientation][0] for orientation in STREETS}
+DRILLDOWN = dict(date='drilldown-date',
+                 resolution='drilldown-resolution-radio',
+                 graph_div='drilldown-graph-div',
+                 graph='drilldown-graph')
+
+# Stores of the changes to patch into the table and graphs when stepping
+# through date ranges, and of what each displays
+NAVIGATION = dict(table_delta='table-delta-store',
+                  table_displayed='table-displayed-store',
+                  graph_deltas=['eb-graph-delta-store', 'wb-graph-delta-store'],
+                  graph_displayed=['eb-graph-displayed-store', 'wb-graph-displayed-store'])
+# Tables and figures to keep for comparing with the next date range displayed
+NAVIGATION_CACHE_SIZE = 64
+
+LAYOUTS = dict(streets='streets-div',
+               heatmap='heatmap-div')
+
+# Value of the tab displaying the heatmap of all streets
+HEATMAP_TAB = 'heatmap'
+
+# Default selected streets for each tab of each corridor
+INITIAL_STATE = {(corridor, orientation): CORRIDORS[corridor].streets[orientation][0]
+                 for corridor, orientation in SELECTED_STREET_DIVS}
 
 
 ###################################################################################################
@@ -164,8 +966,8 @@ LOGGER = logging.getLogger(__name__)
 #                                                                                                 #
 ###################################################################################################
 
-def pivot_order(df, orientation = 'ew', date_range_type=1):
-    '''Pivot the dataframe around street directions and order by STREETS global var
+def pivot_order(df, orientation = 'ew', date_range_type=1, corridor=DEFAULT_CORRIDOR):
+    '''Pivot the dataframe around street directions and order by the corridor's streets
     '''
     if DATERANGE_TYPES[date_range_type] in ['Last Day', 'Select Date'] and     'date' in df.columns:
         # Don't aggregate by date
@@ -176,8 +978,12 @@ def pivot_order(df, orientation = 'ew', date_range_type=1):
         # Do aggregate by date
         pivoted = df.pivot_table(index='street', columns='direction', values='tt').reset_index()
     pivoted.street = pivoted.street.astype("category")
-    pivoted.street.cat.set_categories(STREETS[orientation], inplace=True)
-    return pivoted.sort_values(['street']).round(1)
+    pivoted.street.cat.set_categories(CORRIDORS[corridor].streets[orientation], inplace=True)
+    # Streets not monitored in this corridor are now missing
+    pivoted.dropna(subset=['street'], inplace=True)
+    directions = pivoted.columns.difference(['street', 'date'])
+    pivoted[directions] = round_tt(pivoted[directions])
+    return pivoted.sort_values(['street'])
 
 def selected_data(data, daterange_type=0, date_range_id=1):
     '''Returns a boolean column indicating whether the provided data was selected or not
@@ -190,55 +996,83 @@ def selected_data(data, daterange_type=0, date_range_id=1):
         date_filter = data['week_number'] == date_range_id
     elif DATERANGE_TYPES[daterange_type] == 'Select Month':
         date_filter = data['month_number'] == date_range_id
+    elif DATERANGE_TYPES[daterange_type] == 'Full History':
+        date_filter = data['category'] == 'Pilot'
     return date_filter
 
-def filter_table_data(period, day_type, orientation='ew', daterange_type=0, date_range_id=1):
+def filter_table_data(period, day_type, orientation='ew', daterange_type=0, date_range_id=1,
+                      corridor=DEFAULT_CORRIDOR):
     '''Return data aggregated and filtered by period, day type, tab, date range
     '''
-
-    date_filter = selected_data(DATA, daterange_type, date_range_id)
+    corridor_data = get_corridor_data(corridor)
+    data, baseline = corridor_data.data, corridor_data.baseline
+    directions = CORRIDORS[corridor].directions[orientation]
 
     #current data
-    filtered = DATA[(DATA['period'] == period) &
-                    (DATA['day_type'] == day_type) &
-                    (DATA['direction'].isin(DIRECTIONS[orientation])) &
-                    (DATA['category'] != 'Excluded') &
-                    (date_filter)]
-    pivoted = pivot_order(filtered, orientation, daterange_type)
+    if DATA_BACKEND == 'pushdown':
+        filtered = pushdown_table_data(period, day_type, directions, daterange_type, date_range_id, corridor)
+    else:
+        date_filter = selected_data(data, daterange_type, date_range_id)
+        filtered = data[(data['period'] == period) &
+                        (data['day_type'] == day_type) &
+                        (data['direction'].isin(directions)) &
+                        (data['category'] != 'Excluded') &
+                        (date_filter)]
+    pivoted = pivot_order(filtered, orientation, daterange_type, corridor)
 
     #baseline data
-    filtered_base = BASELINE[(BASELINE['period'] == period) &
-                             (BASELINE['day_type'] == day_type) &
-                             (BASELINE['direction'].isin(DIRECTIONS[orientation]))]
-    pivoted_baseline = pivot_order(filtered_base, orientation)
+    filtered_base = baseline[(baseline['period'] == period) &
+                             (baseline['day_type'] == day_type) &
+                             (baseline['direction'].isin(directions))]
+    pivoted_baseline = pivot_order(filtered_base, orientation, corridor=corridor)
 
     return (pivoted, pivoted_baseline)
 
-def graph_bounds_for_date_range(daterange_type, date_range_id):
+def pushdown_table_data(period, day_type, directions, daterange_type=0, date_range_id=1,
+                        corridor=DEFAULT_CORRIDOR):
+    '''Query the daily data, or the week, month or full history averages, of
+    the directions for a period and day type in the date range
+    '''
+    params = [period, day_type] + list(directions)
+    if DATERANGE_TYPES[daterange_type] == 'Last Day':
+        return hot_pushdown_query(corridor, 'most_recent', params)
+    elif DATERANGE_TYPES[daterange_type] == 'Select Date':
+        return hot_pushdown_query(corridor, 'date', params + [date_range_id])
+    range_types = {'Select Week': 'week', 'Select Month': 'month', 'Full History': 'history'}
+    return hot_pushdown_query(corridor, 'aggregated',
+                              params + [range_types[DATERANGE_TYPES[daterange_type]], date_range_id])
+
+def graph_bounds_for_date_range(daterange_type, date_range_id, corridor=DEFAULT_CORRIDOR):
     '''Determine bounds for the x-axis of the graphs based on the type of 
     daterange and the selected date range
     '''
+    corridor_data = get_corridor_data(corridor)
+    daterange, weeks, months = corridor_data.daterange, corridor_data.weeks, corridor_data.months
     if DATERANGE_TYPES[daterange_type] == 'Last Day':
-        end_range = DATERANGE[1] + relativedelta(days=1)
-        start_range = DATERANGE[1] - relativedelta(weeks=2)
+        end_range = daterange[1] + relativedelta(days=1)
+        start_range = daterange[1] - relativedelta(weeks=2)
         date_picked = date_range_id
     elif DATERANGE_TYPES[daterange_type] in ['Select Date', 'Select Week']:
         if DATERANGE_TYPES[daterange_type] == 'Select Date':
             date_picked = date_range_id
         else:
-            date_picked = WEEKS[WEEKS['week_number'] == date_range_id]['week'].iloc[0]
+            date_picked = weeks[weeks['week_number'] == date_range_id]['week'].iloc[0]
         start_of_week = date_picked - relativedelta(days=date_picked.weekday())
-        start_range = max(start_of_week - relativedelta(weeks=1), DATERANGE[0])
-        end_range = min(start_of_week + relativedelta(weeks=2), DATERANGE[1] + relativedelta(days=1))
+        start_range = max(start_of_week - relativedelta(weeks=1), daterange[0])
+        end_range = min(start_of_week + relativedelta(weeks=2), daterange[1] + relativedelta(days=1))
     elif DATERANGE_TYPES[daterange_type] == 'Select Month':
-        date_picked = MONTHS[MONTHS['month_number'] == date_range_id]['month'].iloc[0].date()
-        if date_picked == DATERANGE[1].replace(day=1):
+        date_picked = months[months['month_number'] == date_range_id]['month'].iloc[0].date()
+        if date_picked == daterange[1].replace(day=1):
             #End of data within month picked, display last month of data
-            start_range = max(DATERANGE[1] - relativedelta(months=1), DATERANGE[0])
+            start_range = max(daterange[1] - relativedelta(months=1), daterange[0])
         else:
-            start_range = max(date_picked - relativedelta(days=date_picked.day - 1), DATERANGE[0])
+            start_range = max(date_picked - relativedelta(days=date_picked.day - 1), daterange[0])
         end_range = min(date_picked - relativedelta(days=date_picked.day - 1) + relativedelta(months=1),
-                        DATERANGE[1] + relativedelta(days=1))
+                        daterange[1] + relativedelta(days=1))
+    elif DATERANGE_TYPES[daterange_type] == 'Full History':
+        date_picked = None
+        start_range = daterange[0]
+        end_range = daterange[1] + relativedelta(days=1)
     else:
         raise ValueError('Wrong daterange_type provided: {}'.format(daterange_type))
     LOGGER.debug('Filtering for %s. Date picked: %s, Start Range: %s, End Range: %s',
@@ -246,51 +1080,244 @@ def graph_bounds_for_date_range(daterange_type, date_range_id):
     return [start_range, end_range]
 
 def filter_graph_data(street, direction, day_type='Weekday', period='AMPK',
-                      daterange_type=0, date_range_id=1):
+                      daterange_type=0, date_range_id=1, corridor=DEFAULT_CORRIDOR):
     '''Filter dataframes by street, direction, day_type, and period
     Returns a filtered baseline, and a filtered current dataframe
     '''
-
-    daterange = graph_bounds_for_date_range(daterange_type, date_range_id)
-    filtered_daily = DATA[(DATA['street'] == street) &
-                          (DATA['period'] == period) &
-                          (DATA['day_type'] == day_type) &
-                          (DATA['direction'] == direction) & 
-                          (DATA['date'] >= daterange[0]) & 
-                          (DATA['date'] < daterange[1])
-                          ]
-
-    base_line = BASELINE[(BASELINE['street'] == street) &
-                         (BASELINE['period'] == period) &
-                         (BASELINE['day_type'] == day_type) &
-                         (BASELINE['direction'] == direction)]
+    corridor_data = get_corridor_data(corridor)
+    data, baseline = corridor_data.data, corridor_data.baseline
+
+    daterange = graph_bounds_for_date_range(daterange_type, date_range_id, corridor)
+    if DATA_BACKEND == 'pushdown':
+        filtered_daily = hot_pushdown_query(corridor, 'graph',
+                                            [street, direction, day_type, period, daterange[0], daterange[1]])
+        filtered_daily = filtered_daily.assign(above_threshold=filtered_daily['above_threshold'].astype(bool))
+    else:
+        filtered_daily = data[(data['street'] == street) &
+                              (data['period'] == period) &
+                              (data['day_type'] == day_type) &
+                              (data['direction'] == direction) & 
+                              (data['date'] >= daterange[0]) & 
+                              (data['date'] < daterange[1])
+                              ]
+
+    base_line = baseline[(baseline['street'] == street) &
+                         (baseline['period'] == period) &
+                         (baseline['day_type'] == day_type) &
+                         (baseline['direction'] == direction)]
 
     base_line_data = filtered_daily[filtered_daily['category'] == 'Baseline']
 
-    selected_filter = selected_data(filtered_daily, daterange_type, date_range_id)
+    if DATERANGE_TYPES[daterange_type] == 'Full History':
+        # No days to highlight, and too many to send them all
+        selected_filter = pd.Series(False, index=filtered_daily.index)
+    else:
+        selected_filter = selected_data(filtered_daily, daterange_type, date_range_id)
 
     pilot_data = filtered_daily[(filtered_daily['category'] == 'Pilot') &
                                 ~(selected_filter)]
 
     pilot_data_selected = filtered_daily[(filtered_daily['category'] == 'Pilot') &
                                          (selected_filter)]
+
+    if DATERANGE_TYPES[daterange_type] == 'Full History':
+        base_line_data = downsample(base_line_data)
+        pilot_data = downsample(pilot_data)
     return (base_line, base_line_data, pilot_data, pilot_data_selected)
 
-def get_orientation_from_dir(direction):
+def weekdays(dates):
+    '''Day of the week of each datetime64[D] date, from 0 for Monday to 6 for
+    Sunday
+    '''
+    # Day 0 of datetime64 is a Thursday
+    return (dates.astype(np.int64) + 3) % 7
+
+def week_starts(dates):
+    '''Monday of the week of each datetime64[D] date'''
+    return dates - weekdays(dates)
+
+def month_starts(dates):
+    '''First day of the month of each datetime64[D] date'''
+    return dates.astype('datetime64[M]').astype('datetime64[D]')
+
+def bucket_means(dates, values, bucket_starts):
+    '''Average each column of values by the start of the bucket (week or month)
+    of their dates, ignoring missing values
+    Returns the start of each bucket and the means of each column
+    '''
+    starts, bucket = np.unique(bucket_starts(dates), return_inverse=True)
+    valid = ~np.isnan(values)
+    means = np.empty((len(starts), values.shape[1]))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for column in range(values.shape[1]):
+            means[:, column] = (np.bincount(bucket, weights=np.where(valid[:, column], values[:, column], 0),
+                                            minlength=len(starts)) /
+                                np.bincount(bucket, weights=valid[:, column], minlength=len(starts)))
+    return starts, means
+
+def lttb(x, y, n_out):
+    '''Indices of the n_out points of a series sorted by x that best preserve
+    its shape, using the Largest-Triangle-Three-Buckets algorithm
+
+    The first and last points are always kept, the others are split into
+    n_out - 2 buckets from which the point forming the largest triangle with
+    the previously kept point and the average of the next bucket is kept.
+    '''
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    sizes = np.diff(edges)
+    # Average point of each bucket, with the last point closing the series
+    avg_x = np.append(np.add.reduceat(x[:-1], edges[:-1]) / sizes, x[-1])
+    avg_y = np.append(np.add.reduceat(y[:-1], edges[:-1]) / sizes, y[-1])
+    kept = np.empty(n_out, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    for i in range(n_out - 2):
+        a = kept[i]
+        candidates = slice(edges[i], edges[i + 1])
+        areas = np.abs((x[a] - avg_x[i + 1]) * (y[candidates] - y[a]) -
+                       (x[a] - x[candidates]) * (avg_y[i + 1] - y[a]))
+        kept[i + 1] = edges[i] + np.argmax(areas)
+    return kept
+
+def downsample(df, max_points=MAX_GRAPH_POINTS):
+    '''Reduce a series of daily travel times to at most max_points rows
+
+    Days are averaged by week, or by month if there are still too many weeks,
+    with a week or month above the threshold if most of its days were. If there
+    are too many months, the days best preserving the shape of the series are
+    kept instead.
+    '''
+    if len(df) <= max_points:
+        return df
+    df = df.sort_values('date')
+    dates = df['date'].values.astype('datetime64[D]')
+    columns = ['tt'] + ['rolling_' + str(window) for window in ROLLING_WINDOWS] + ['above_threshold']
+    values = df[columns].values.astype(np.float64)
+    for bucket_starts in [week_starts, month_starts]:
+        starts, means = bucket_means(dates, values, bucket_starts)
+        if len(starts) <= max_points:
+            downsampled = pd.DataFrame(means, columns=columns).round(1)
+            downsampled['above_threshold'] = downsampled['above_threshold'] > 0.5
+            downsampled.insert(0, 'date', starts.astype(object))
+            return downsampled
+    return df.iloc[lttb(dates.astype(np.float64), values[:, 0], max_points)]
+
+def filter_heatmap_data(day_type, period, start_date, end_date, corridor=DEFAULT_CORRIDOR):
+    '''Slice the heatmap of a corridor for a day type and period between two
+    dates, dropping the days without data
+    Returns the street directions, the dates and the difference from baseline
+    of each street direction on each date
+    '''
+    heatmap = get_corridor_data(corridor).heatmap
+    start = max(0, int((np.datetime64(start_date, 'D') - heatmap.start).astype(np.int64)))
+    end = min(heatmap.n_days, int((np.datetime64(end_date, 'D') - heatmap.start).astype(np.int64)) + 1)
+    if (day_type, period) not in heatmap.groups or start >= end:
+        return heatmap.rows, np.array([], dtype='datetime64[D]'), np.empty((len(heatmap.rows), 0))
+    diffs = heatmap.diffs[heatmap.groups[(day_type, period)], :, start:end]
+    has_data = ~np.isnan(diffs).all(axis=0)
+    return heatmap.rows, (heatmap.start + np.arange(start, end))[has_data], diffs[:, has_data]
+
+def nan_mean(values, axis=-1):
+    '''Mean of values along an axis ignoring missing values, in single
+    precision, or NaN where all of them are missing
+    '''
+    valid = ~np.isnan(values)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (np.where(valid, values, 0).sum(axis=axis, dtype=np.float32) /
+                valid.sum(axis=axis, dtype=np.float32))
+
+def resample_bins(tt, minutes):
+    '''Average sub-daily bins along the last axis into bins of minutes, a
+    multiple of BIN_MINUTES
+    '''
+    return nan_mean(tt.reshape(tt.shape[:-1] + (-1, minutes // BIN_MINUTES)))
+
+# Time periods ranges, such as "7-10 AM" or "10 AM-3 PM"
+PERIOD_RANGE = re.compile(r'(\d{1,2})(?::(\d{2}))?\s*([AP]M)?\s*-\s*(\d{1,2})(?::(\d{2}))?\s*([AP]M)', re.IGNORECASE)
+
+def clock_minutes(hour, minute, meridiem):
+    '''Minutes from midnight of a 12-hour clock time'''
+    return int(hour) % 12 * 60 + int(minute or 0) + (720 if meridiem.upper() == 'PM' else 0)
+
+def period_minutes(period_range):
+    '''Start and end of a time period in minutes from midnight, parsed from
+    its range, or None if it can't be parsed
+    '''
+    match = PERIOD_RANGE.search(period_range)
+    if match is None:
+        return None
+    start_hour, start_minute, start_meridiem, end_hour, end_minute, end_meridiem = match.groups()
+    end = clock_minutes(end_hour, end_minute, end_meridiem)
+    start = clock_minutes(start_hour, start_minute, start_meridiem or end_meridiem)
+    if start >= end and start_meridiem is None:
+        # e.g. 11-2 PM
+        start -= 720
+    if start < 0 or start >= end:
+        return None
+    return start, end
+
+def period_means(tt, period_range):
+    '''Average of the sub-daily bins within a time period along the last axis,
+    e.g. of each day and street direction, or None if the period range can't
+    be parsed
+    '''
+    bounds = period_minutes(period_range)
+    if bounds is None:
+        return None
+    return nan_mean(tt[..., bounds[0] // BIN_MINUTES:-(-bounds[1] // BIN_MINUTES)])
+
+def filter_drilldown_data(street, orientation, selected_date, period, minutes=BIN_MINUTES,
+                          corridor=DEFAULT_CORRIDOR):
+    '''Resample the sub-daily travel times of both directions of a street on a
+    date, and on the days of the same day type loaded for the corridor
+    Returns the start of each resampled bin in minutes, then for each direction
+    the travel times of the selected date and their typical values, and the
+    average of each direction over the time period on the selected date and
+    the time period's bounds (both None if the period has no range). Returns
+    None if the date hasn't been loaded.
+    '''
+    subdaily = get_subdaily(corridor)
+    day = int((np.datetime64(selected_date, 'D') - subdaily.start).astype(np.int64))
+    if not 0 <= day < subdaily.n_days:
+        return None
+    rows = [subdaily.rows.index((street, direction)) for direction in CORRIDORS[corridor].directions[orientation]]
+    days = subdaily.start + np.arange(subdaily.n_days)
+    weekend = weekdays(days) >= 5
+    similar = (weekend == weekend[day]) & (np.arange(subdaily.n_days) != day)
+
+    selected = resample_bins(subdaily.tt[day, rows], minutes)
+    # Index days and rows together so that only the two rows are copied
+    typical = resample_bins(nan_mean(subdaily.tt[np.flatnonzero(similar)[:, None], rows], axis=0), minutes)
+    timeperiods = get_corridor_data(corridor).timeperiods
+    period_range = timeperiods[(timeperiods['period'] == period) &
+                               (timeperiods['day_type'] == ('Weekend' if weekend[day] else 'Weekday'))]['period_range']
+    if period_range.empty or period_minutes(period_range.iloc[0]) is None:
+        return np.arange(0, 24 * 60, minutes), selected, typical, None, None
+    return (np.arange(0, 24 * 60, minutes), selected, typical,
+            period_means(subdaily.tt[day, rows], period_range.iloc[0]), period_minutes(period_range.iloc[0]))
+
+def get_orientation_from_dir(direction, corridor=DEFAULT_CORRIDOR):
     '''Get the orientation of the street based on its direction'''
-    for orientation, direction_list in DIRECTIONS.items():
+    for orientation, direction_list in CORRIDORS[corridor].directions.items():
         if direction in direction_list:
             return orientation
 
-def get_timeperiods_for_date(selected_date):
+def get_timeperiods_for_date(selected_date, corridor=DEFAULT_CORRIDOR):
     '''Get available timeperiods for the selected date'''
-    timeperiods = DATA[DATA['date']==selected_date]['period'].unique()
+    corridor_data = get_corridor_data(corridor)
+    data, timeperiods_all = corridor_data.data, corridor_data.timeperiods
+    if DATA_BACKEND == 'pushdown':
+        timeperiods = hot_pushdown_query(corridor, 'periods_for_date', [selected_date])['period'].values
+    else:
+        timeperiods = data[data['date']==selected_date]['period'].unique()
     if selected_date.weekday() > 4: #Weekend
-        return TIMEPERIODS[(TIMEPERIODS['day_type']=='Weekend')&
-                           (TIMEPERIODS['period'].isin(timeperiods))]['period'].values
+        return timeperiods_all[(timeperiods_all['day_type']=='Weekend')&
+                               (timeperiods_all['period'].isin(timeperiods))]['period'].values
     else:
-        return TIMEPERIODS[(TIMEPERIODS['day_type']=='Weekday')&
-                           (TIMEPERIODS['period'].isin(timeperiods))]['period'].values
+        return timeperiods_all[(timeperiods_all['day_type']=='Weekday')&
+                               (timeperiods_all['period'].isin(timeperiods))]['period'].values
 
 ###################################################################################################
 #                                                                                                 #
@@ -299,22 +1326,32 @@ def get_timeperiods_for_date(selected_date):
 ###################################################################################################
 
 
-def generate_date_ranges(daterange_type=2):
+def generate_date_ranges(daterange_type=2, corridor=DEFAULT_CORRIDOR):
     '''Generate an array of dropdown menu options depending on the date range type
     '''
-
+    corridor_data = get_corridor_data(corridor)
     if DATERANGE_TYPES[daterange_type] == 'Select Week':
         # Weeks
         return [{'label': row.label,
                  'value': row.week_number}
-                for row in WEEKS.itertuples()]
+                for row in corridor_data.weeks.itertuples()]
     elif DATERANGE_TYPES[daterange_type] == 'Select Month':
         return [{'label': row.label,
                  'value': row.month_number}
-                for row in MONTHS.itertuples()]
+                for row in corridor_data.months.itertuples()]
     else:
         return [{'label':'No daterange value', 'value':1}]
 
+def generate_tabs(corridor=DEFAULT_CORRIDOR):
+    '''Generate a tab for each orientation of streets in the corridor'''
+    return [dcc.Tab(label=label, value=orientation)
+            for orientation, label in CORRIDORS[corridor].tab_labels.items()] + \
+           [dcc.Tab(label='All Streets', value=HEATMAP_TAB)]
+
+def street_row_id(corridor, street):
+    '''Id of the table row for a street, unique across corridors'''
+    return corridor + '-' + street
+
 def generate_row_class(clicked):
     '''Assigns class to clicked row'''
     if clicked:
@@ -344,7 +1381,18 @@ def after_cell_class(before, after):
     else:
         return 'same'
 
-def generate_row(df_row, baseline_row, selected, orientation='ew'):
+def row_values(df_row, baseline_row, directions):
+    '''Baseline and pilot travel times of each direction of a street'''
+    values = []
+    for direction in directions:
+        try:
+            after_val =  df_row[direction]
+        except TypeError:
+            after_val = nan
+        values.append((baseline_row[direction], after_val))
+    return values
+
+def generate_row(df_row, baseline_row, selected, orientation='ew', corridor=DEFAULT_CORRIDOR):
     """Create an HTML row from a database row (each street)
 
         :param df_row:
@@ -356,21 +1404,46 @@ def generate_row(df_row, baseline_row, selected, orientation='ew'):
     """
 
     data_cells = []
+    directions = CORRIDORS[corridor].directions[orientation]
 
-    for i in range(2):
-        baseline_val = baseline_row[DIRECTIONS[orientation][i]]
-        try:
-            after_val =  df_row[DIRECTIONS[orientation][i]]
-        except TypeError:
-            after_val = nan 
+    for baseline_val, after_val in row_values(df_row, baseline_row, directions):
         data_cells.extend(generate_direction_cells(baseline_val, after_val))
 
     return html.Tr([html.Td(df_row['street'], className='segname'), 
                    *data_cells],
-                   id=df_row['street'],
+                   id=street_row_id(corridor, df_row['street']),
                    className=generate_row_class(selected))
 
-def generate_table(selected_street, day_type, period, orientation='ew', daterange_type=0, date_range_id=1):
+def table_values(day_type, period, orientation='ew', daterange_type=0, date_range_id=1, corridor=DEFAULT_CORRIDOR):
+    '''Filter the data for the table, returning the header of the pilot
+    columns, the baseline of each street and its pilot data in the same order
+    '''
+    filtered_data, baseline = filter_table_data(period, day_type, orientation, daterange_type, date_range_id,
+                                                corridor)
+    directions = CORRIDORS[corridor].directions[orientation]
+    #Current date for the data, to replace "After" header
+    if DATERANGE_TYPES[daterange_type] in ['Last Day', 'Select Date']:
+        day = filtered_data['date'].iloc[0].strftime('%a %b %d')
+    elif DATERANGE_TYPES[daterange_type] == 'Select Week':
+        day = 'Week ' + str(date_range_id)
+    elif DATERANGE_TYPES[daterange_type] == 'Select Month':
+        day = 'Month ' + str(date_range_id)
+    elif DATERANGE_TYPES[daterange_type] == 'Full History':
+        day = 'Pilot'
+
+    pilot_rows = []
+    for street in baseline['street'].values:
+        try:
+            pilot_data = filtered_data[filtered_data['street']==street].iloc[0]
+        except IndexError:
+            #No data for street
+            pilot_data = {direction : nan for direction  in directions}
+            pilot_data['street'] = street
+        pilot_rows.append(pilot_data)
+    return day, baseline, pilot_rows
+
+def generate_table(selected_street, day_type, period, orientation='ew', daterange_type=0, date_range_id=1,
+                   corridor=DEFAULT_CORRIDOR):
     """Generate HTML table of streets and before-after values
 
         :param selected_street:
@@ -384,41 +1457,33 @@ def generate_table(selected_street, day_type, period, orientation='ew', daterang
         :param daterange_type:
 
         :param daterange:
-            
+
+        :param corridor:
+            Name of the corridor in CORRIDORS
     """
     LOGGER.debug('Generate table: daterange_type:' + str(daterange_type) 
                  + ', period: ' + str(period)
                  + ', day_type: ' + str(day_type) 
                  + ', date_range_id: ' + str(date_range_id) 
                  + ', orientation: ' + str(orientation)
-                 + ', selected_street: ' + str(selected_street))
-    filtered_data, baseline = filter_table_data(period, day_type, orientation, daterange_type, date_range_id)
-    #Current date for the data, to replace "After" header
-    if DATERANGE_TYPES[daterange_type] in ['Last Day', 'Select Date']:
-        day = filtered_data['date'].iloc[0].strftime('%a %b %d')
-    elif DATERANGE_TYPES[daterange_type] == 'Select Week':
-        day = 'Week ' + str(date_range_id)
-    elif DATERANGE_TYPES[daterange_type] == 'Select Month':
-        day = 'Month ' + str(date_range_id)
+                 + ', selected_street: ' + str(selected_street)
+                 + ', corridor: ' + str(corridor))
+    day, baseline, pilot_rows = table_values(day_type, period, orientation, daterange_type, date_range_id, corridor)
+    directions = CORRIDORS[corridor].directions[orientation]
 
     rows = []
-    for baseline_row, street in zip(baseline.iterrows(), baseline['street'].values):
+    for baseline_row, pilot_data in zip(baseline.iterrows(), pilot_rows):
     # Generate a row for each street, keeping in mind the selected street (which row is clicked)
-        try:
-            pilot_data = filtered_data[filtered_data['street']==street].iloc[0]
-        except IndexError:
-            #No data for street
-            pilot_data = {direction : nan for direction  in DIRECTIONS[orientation]}
-            pilot_data['street'] = street
         row = generate_row(pilot_data,
                            baseline_row[1], 
-                           selected_street == str(street),
-                           orientation)
+                           selected_street == str(pilot_data['street']),
+                           orientation,
+                           corridor)
         rows.append(row) 
 
-    return html.Table([html.Tr([html.Td(""), html.Td(DIRECTIONS[orientation][0], colSpan=2), html.Td(DIRECTIONS[orientation][1], colSpan=2)])] +
+    return html.Table([html.Tr([html.Td(""), html.Td(directions[0], colSpan=2), html.Td(directions[1], colSpan=2)])] +
                       [html.Tr([html.Td(""), html.Td(day), html.Td("Baseline"), html.Td(day), html.Td("Baseline")])] +
-                      rows, id='data_table')
+                      rows, id=TABLE_ID)
 
 def generate_graph_data(data, **kwargs):
     return dict(x=data['date'],
@@ -431,18 +1496,56 @@ def generate_graph_data(data, **kwargs):
                                     size=12),
                 **kwargs)
 
+def generate_overlays(overlays, base_line, graphed_days):
+    '''Generate the traces and shapes of the selected overlays from the
+    statistics precomputed for each day and baseline
+    '''
+    data = []
+    shapes = []
+    for overlay in overlays:
+        if overlay.startswith('rolling_'):
+            data.append(dict(x=graphed_days['date'],
+                             y=graphed_days[overlay],
+                             hoverinfo='x+y',
+                             mode='lines',
+                             type='scatter',
+                             line=dict(color=PLOT_COLORS[overlay], width=2),
+                             name=OVERLAYS[overlay]))
+        elif overlay == 'band' and base_line.iloc[0][['tt_low', 'tt_high']].notnull().all():
+            shapes.append({'type': 'rect',
+                           'x0': 0,
+                           'x1': 1,
+                           'xref': 'paper',
+                           'y0': base_line.iloc[0]['tt_low'],
+                           'y1': base_line.iloc[0]['tt_high'],
+                           'fillcolor': PLOT_COLORS['band'],
+                           'line': {'width': 0},
+                           'layer': 'below'})
+        elif overlay == 'above_threshold':
+            above = graphed_days[graphed_days['above_threshold'] & (graphed_days['category'] == 'Pilot')]
+            data.append(dict(x=above['date'],
+                             y=above['tt'],
+                             hoverinfo='x+y',
+                             mode='markers',
+                             type='scatter',
+                             marker=dict(color=PLOT_COLORS['above_threshold'], symbol='triangle-up', size=8),
+                             name=OVERLAYS[overlay]))
+    return data, shapes
+
 def generate_figure(street, direction, day_type='Weekday', period='AMPK',
-                    daterange_type=0, date_range_id=1):
-    '''Generate a Dash bar chart of average travel times by day
+                    daterange_type=0, date_range_id=1, overlays=(), corridor=DEFAULT_CORRIDOR):
+    '''Generate a Dash bar chart of average travel times by day, with the
+    selected overlays
     '''
     base_line, base_df, after_df, selected_df = filter_graph_data(street,
                                                                   direction,
                                                                   day_type,
                                                                   period,
                                                                   daterange_type,
-                                                                  date_range_id)
+                                                                  date_range_id,
+                                                                  corridor)
 
-    orientation = get_orientation_from_dir(direction)
+    orientation = get_orientation_from_dir(direction, corridor)
     data = []
     if after_df.empty:
         if selected_df.empty:
@@ -462,6 +1565,13 @@ def generate_figure(street, direction, day_type='Weekday', period='AMPK',
                                             marker=dict(color=PLOT_COLORS['baseline']),
                                             name='Baseline')
         data.append(baseline_data)
+
+    overlay_data, overlay_shapes = generate_overlays(overlays or [], base_line,
+                                                     pd.concat([base_df.assign(category='Baseline'),
+                                                                after_df.assign(category='Pilot'),
+                                                                selected_df.assign(category='Pilot')],
+                                                               sort=False).sort_values('date'))
+    data.extend(overlay_data)
     
     annotations = [dict(x=-0.008,
                         y=base_line.iloc[0]['tt'] + 2,
@@ -486,14 +1596,182 @@ def generate_figure(street, direction, day_type='Weekday', period='AMPK',
                   xaxis=dict(title='Date',
                               fixedrange=True), #Prevents zoom
                   yaxis=dict(title='Travel Time (min)',
-                              range=[0, MAX_TIME[orientation]],
+                              range=[0, get_corridor_data(corridor).max_time[orientation]],
                               fixedrange=True),
-                  shapes=[line],
+                  shapes=[line] + overlay_shapes,
                   margin=PLOT['margin'],
                   annotations=annotations,
                   legend={'xanchor':'right'}
                   )
     return {'layout': layout, 'data': data}
+
+def generate_heatmap(day_type, period, start_date, end_date, corridor=DEFAULT_CORRIDOR):
+    '''Generate a heatmap of the difference from baseline of every street
+    direction by day
+    '''
+    rows, dates, diffs = filter_heatmap_data(day_type, period, start_date, end_date, corridor)
+    data = [dict(x=dates.astype(str),
+                 y=[street + ' ' + direction for street, direction in rows],
+                 z=diffs.astype(np.float64).round(1),
+                 type='heatmap',
+                 zmin=-HEATMAP_RANGE,
+                 zmax=HEATMAP_RANGE,
+                 colorscale=HEATMAP_COLORS,
+                 hoverinfo='x+y+z',
+                 colorbar=dict(title='Minutes vs Baseline'))]
+    layout = dict(font={'family': FONT_FAMILY},
+                  autosize=True,
+                  height=120 + 20 * len(rows),
+                  xaxis=dict(title='Date',
+                             fixedrange=True),
+                  yaxis=dict(autorange='reversed',
+                             fixedrange=True),
+                  margin=dict(PLOT['margin'], l=160))
+    return {'layout': layout, 'data': data}
+
+def generate_drilldown(street, orientation, selected_date, period, minutes=BIN_MINUTES, corridor=DEFAULT_CORRIDOR):
+    '''Generate a line chart of the sub-daily travel times of both directions
+    of a street on a date against their typical values, with the selected time
+    period shaded
+    '''
+    drilldown = filter_drilldown_data(street, orientation, selected_date, period, minutes, corridor)
+    if drilldown is None or np.isnan(drilldown[1]).all():
+        return None
+    starts, selected, typical, period_average, bounds = drilldown
+    labels = ['{:02d}:{:02d}'.format(*divmod(int(start), 60)) for start in starts]
+    data = []
+    shapes = []
+    if bounds is not None:
+        shapes.append({'type': 'rect',
+                       'x0': bounds[0] / 60,
+                       'x1': bounds[1] / 60,
+                       'xref': 'x',
+                       'y0': 0,
+                       'y1': 1,
+                       'yref': 'paper',
+                       'fillcolor': PLOT_COLORS['band'],
+                       'line': {'width': 0},
+                       'layer': 'below'})
+    for i, direction in enumerate(CORRIDORS[corridor].directions[orientation]):
+        color = DRILLDOWN_COLORS[i % len(DRILLDOWN_COLORS)]
+        data.append(dict(x=starts / 60,
+                         y=selected[i].astype(np.float64).round(1),
+                         text=labels,
+                         hoverinfo='text+y',
+                         mode='lines',
+                         type='scatter',
+                         line=dict(color=color, width=2),
+                         name=direction))
+        data.append(dict(x=starts / 60,
+                         y=typical[i].astype(np.float64).round(1),
+                         text=labels,
+                         hoverinfo='text+y',
+                         mode='lines',
+                         type='scatter',
+                         line=dict(color=color, width=1, dash='dot'),
+                         name='Typical ' + direction))
+        if period_average is not None and not np.isnan(period_average[i]):
+            # Average of the period resampled from the bins
+            shapes.append({'type': 'line',
+                           'x0': bounds[0] / 60,
+                           'x1': bounds[1] / 60,
+                           'xref': 'x',
+                           'y0': float(period_average[i]),
+                           'y1': float(period_average[i]),
+                           'line': dict(color=color, width=2, dash='dash')})
+    layout = dict(font={'family': FONT_FAMILY},
+                  autosize=True,
+                  height=225,
+                  xaxis=dict(title='Hour',
+                             range=[0, 24],
+                             dtick=3,
+                             fixedrange=True),
+                  yaxis=dict(title='Travel Time (min)',
+                             rangemode='tozero',
+                             fixedrange=True),
+                  shapes=shapes,
+                  margin=PLOT['margin'],
+                  legend={'xanchor':'right'})
+    return {'layout': layout, 'data': data}
+
+@lru_cache(maxsize=NAVIGATION_CACHE_SIZE)
+def table_cells(day_type, period, orientation, daterange_type, date_range_id, corridor, version):
+    '''Header of the pilot columns of the table and its pilot cells, as the
+    (street row, direction, text, class) of each, cached by the version of the
+    data of the corridor so that consecutive date ranges can be compared
+    '''
+    day, baseline, pilot_rows = table_values(day_type, period, orientation, daterange_type, date_range_id, corridor)
+    directions = CORRIDORS[corridor].directions[orientation]
+    cells = []
+    for row, (baseline_row, pilot_data) in enumerate(zip(baseline.iterrows(), pilot_rows)):
+        for i, (before, after) in enumerate(row_values(pilot_data, baseline_row[1], directions)):
+            text = intstr(after)
+            cells.append((row, i, text if isinstance(text, str) else None, after_cell_class(before, after)))
+    return day, tuple(cells)
+
+def table_delta(previous, current):
+    '''The header if it changed and the cells that changed between two results
+    of table_cells for the same table
+    '''
+    return {'header': current[0] if current[0] != previous[0] else None,
+            'cells': [cell for cell, old in zip(current[1], previous[1]) if cell != old]}
+
+@lru_cache(maxsize=NAVIGATION_CACHE_SIZE)
+def figure_json(street, direction, day_type, period, daterange_type, date_range_id, overlays, corridor, version):
+    '''generate_figure converted to JSON types, cached like table_cells. The
+    result must not be modified.
+    '''
+    figure = generate_figure(street, direction, day_type, period, daterange_type, date_range_id, list(overlays),
+                             corridor)
+    if figure is None:
+        return None
+    return json.loads(json.dumps(figure, cls=PlotlyJSONEncoder))
+
+def figure_delta(previous, current):
+    '''The traces of a figure that changed from the previous one, with only
+    their changed keys unless keys were removed, and its layout if it changed
+    '''
+    traces = {}
+    for i, trace in enumerate(current['data']):
+        old = previous['data'][i] if i < len(previous['data']) else {}
+        changed = {key: value for key, value in trace.items() if old.get(key) != value}
+        if set(old) - set(trace):
+            traces[str(i)] = {'replace': True, 'keys': trace}
+        elif changed:
+            traces[str(i)] = {'replace': False, 'keys': changed}
+    return {'n_traces': len(current['data']),
+            'traces': traces,
+            'layout': current['layout'] if current['layout'] != previous['layout'] else None}
+
+def navigating(displayed, view, version):
+    '''Whether an update only steps to another date range of the view
+    displayed, with the same version of the data, which is the same in every
+    worker process that has loaded the same rows
+
+    Only the view is compared rather than which controls triggered the update,
+    as picking a date also sets the day type and time period again, if only
+    to the same values.
+    '''
+    return displayed is not None and displayed['view'] == view and displayed.get('version') == version
+
+def selected_date_range(daterange_type, date_range, date_picked):
+    '''Date range id of the date range dropdown, or of the date picker when selecting a date'''
+    if daterange_type == 1:
+        return datetime.strptime(date_picked, '%Y-%m-%d').date()
+    return date_range
+
+def layout_defaults(corridor):
+    '''Day types, first day type and period, and date range of a corridor for
+    the initial layout, so that no reference to its data outlives the call
+    and it can still be evicted
+    '''
+    corridor_data = get_corridor_data(corridor)
+    first = corridor_data.timeperiods.iloc[0]
+    return (list(corridor_data.timeperiods['day_type'].unique()), first['day_type'], first['period'],
+            corridor_data.daterange)
+
+DEFAULT_DAY_TYPES, DEFAULT_DAY_TYPE, DEFAULT_PERIOD, DEFAULT_DATERANGE = layout_defaults(DEFAULT_CORRIDOR)
+DEFAULT_ORIENTATION = next(iter(CORRIDORS[DEFAULT_CORRIDOR].streets))
                                           
 #Elements to include in the "main-"
 STREETS_LAYOUT = html.Div(children=[html.Div(children=[
@@ -501,13 +1779,13 @@ STREETS_LAYOUT = html.Div(children=[html.Div(children=[
     html.Button(id=CONTROLS['toggle'], children='Show Filters'),
     html.Div(id=CONTROLS['div_id'],
              children=[dcc.RadioItems(id=CONTROLS['timeperiods'],
-                                      value=TIMEPERIODS.iloc[0]['period'],
+                                      value=DEFAULT_PERIOD,
                                       className='radio-toolbar'),
                        dcc.RadioItems(id=CONTROLS['day_types'],
                                       options=[{'label': day_type,
                                                 'value': day_type}
-                                               for day_type in TIMEPERIODS['day_type'].unique()],
-                                      value=TIMEPERIODS.iloc[0]['day_type'],
+                                               for day_type in DEFAULT_DAY_TYPES],
+                                      value=DEFAULT_DAY_TYPE,
                                       className='radio-toolbar'),
                        html.Span(children=[
                            html.Span(dcc.Dropdown(id=CONTROLS['date_range_type'],
@@ -525,17 +1803,25 @@ STREETS_LAYOUT = html.Div(children=[html.Div(children=[
                                      style={'display':'none'}),
                            html.Span(dcc.DatePickerSingle(id=CONTROLS['date_picker'],
                                                           clearable=False,
-                                                          min_date_allowed=DATERANGE[0],
-                                                          max_date_allowed=DATERANGE[1],
-                                                          date=DATERANGE[1],
+                                                          min_date_allowed=DEFAULT_DATERANGE[0],
+                                                          max_date_allowed=DEFAULT_DATERANGE[1],
+                                                          date=DEFAULT_DATERANGE[1],
                                                           display_format='MMM DD',
                                                           month_format='MMM',
                                                           show_outside_days=True),
                                      id=CONTROLS['date_picker_span'],
                                      style={'display':'none'})
-                                     ])],
+                                     ]),
+                       dcc.Checklist(id=CONTROLS['overlays'],
+                                     options=[{'label': label, 'value': overlay}
+                                              for overlay, label in OVERLAYS.items()],
+                                     value=[],
+                                     className='radio-toolbar')],
              style={'display':'none'}),
-    html.Div(id=TABLE_DIV_ID, children=generate_table(INITIAL_STATE['ew'], 'Weekday', 'AM Peak')),
+    html.Div(id=TABLE_DIV_ID, children=generate_table(INITIAL_STATE[(DEFAULT_CORRIDOR, DEFAULT_ORIENTATION)],
+                                                      DEFAULT_DAY_TYPE,
+                                                      DEFAULT_PERIOD,
+                                                      orientation=DEFAULT_ORIENTATION)),
     html.Div([html.B('Travel Time', style={'background-color':'#E9A3C9'}),
               ' 1+ min', html.B(' longer'), ' than baseline']),
     html.Div([html.B('Travel Time', style={'background-color':'#A1D76A'}),
@@ -547,29 +1833,73 @@ STREETS_LAYOUT = html.Div(children=[html.Div(children=[
     html.Div(id = GRAPHDIVS[0], children=dcc.Graph(id=GRAPHS[0]), className='eight columns'),
     html.H2(id=STREETNAME_DIV[1], children=[html.B('Dundas Westbound:'),
                                                 ' Jarvis - Bathurst']),
-    html.Div(id = GRAPHDIVS[1], children=dcc.Graph(id=GRAPHS[1]), className='eight columns')
+    html.Div(id = GRAPHDIVS[1], children=dcc.Graph(id=GRAPHS[1]), className='eight columns'),
+    html.Div(children=[dcc.RadioItems(id=DRILLDOWN['resolution'],
+                                      options=[{'label': label, 'value': minutes}
+                                               for minutes, label in DRILLDOWN_RESOLUTIONS.items()],
+                                      value=BIN_MINUTES,
+                                      className='radio-toolbar'),
+                       html.Div(id=DRILLDOWN['graph_div'])],
+             title='Click a day on the graphs above to see its travel times through the day',
+             className='eight columns')
                ], id=LAYOUTS['streets'])
 
-app.layout = html.Div([html.Div(children=[html.H1(children=TITLE, id='title')],
+HEATMAP_LAYOUT = html.Div(children=[html.Div(children=[
+    dcc.RadioItems(id=HEATMAP['day_types'],
+                   options=[{'label': day_type,
+                             'value': day_type}
+                            for day_type in DEFAULT_DAY_TYPES],
+                   value=DEFAULT_DAY_TYPE,
+                   className='radio-toolbar'),
+    dcc.RadioItems(id=HEATMAP['timeperiods'],
+                   value=DEFAULT_PERIOD,
+                   className='radio-toolbar'),
+    html.Span(dcc.DatePickerRange(id=HEATMAP['date_range'],
+                                  min_date_allowed=DEFAULT_DATERANGE[0],
+                                  max_date_allowed=DEFAULT_DATERANGE[1],
+                                  start_date=max(DEFAULT_DATERANGE[0],
+                                                 DEFAULT_DATERANGE[1] - relativedelta(days=HEATMAP_DAYS)),
+                                  end_date=DEFAULT_DATERANGE[1],
+                                  display_format='MMM DD',
+                                  month_format='MMM'),
+              title='Select the dates to display')],
+                                             className='row'),
+    html.Div(dcc.Graph(id=HEATMAP['graph'], config={'displayModeBar': False}), className='row')
+               ], id=LAYOUTS['heatmap'], style={'display':'none'})
+
+app.layout = html.Div([html.Div(children=[html.H1(children=TITLE, id='title'),
+                                          html.Div(dcc.Dropdown(id=CORRIDOR_DROPDOWN,
+                                                                options=[{'label': corridor.title,
+                                                                          'value': name}
+                                                                         for name, corridor in CORRIDORS.items()],
+                                                                value=DEFAULT_CORRIDOR,
+                                                                clearable=False),
+                                                   title='Select a corridor to monitor',
+                                                   # Only needed when monitoring more than one corridor
+                                                   style={'display': 'none'} if len(CORRIDORS) == 1 else {})],
                                 className='row twelve columns'),
-                       html.Div(dcc.Tabs(children=[dcc.Tab(label='East-West Streets', value='ew'),
-                                      dcc.Tab(label='North-South Streets', value='ns')],
-                                value='ew',
+                       html.Div(dcc.Tabs(children=generate_tabs(DEFAULT_CORRIDOR),
+                                value=DEFAULT_ORIENTATION,
                                 id='tabs',
                                 style={'font-weight':'bold'})
                                 ,
                                 className='row twelve columns'),
-                       html.Div(id=MAIN_DIV, className='row', children=[STREETS_LAYOUT]),
+                       html.Div(id=MAIN_DIV, className='row', children=[STREETS_LAYOUT, HEATMAP_LAYOUT]),
                        html.Div(children=html.H3(['Created by the ',
                                                   html.A('Big Data Innovation Team',
                                                          href="https://www1.toronto.ca/wps/portal/contentonly?vgnextoid=f98b551ed95ff410VgnVCM10000071d60f89RCRD")],
                                                          style={'text-align':'right',
                                                                 'padding-right':'1em'}),
                                 className='row'),
+                       dcc.Store(id=NAVIGATION['table_delta']),
+                       dcc.Store(id=NAVIGATION['table_displayed']),
+                       *[dcc.Store(id=store_id) for store_id in NAVIGATION['graph_deltas'] + NAVIGATION['graph_displayed']],
+                       # Date of the drill-down graph, the most recent day if empty
+                       html.Div(id=DRILLDOWN['date'], style={'display': 'none'}),
                        *[html.Div(id=div_id,
                                   style={'display': 'none'},
-                                  children=STREETS[orientation][0])
-                         for orientation, div_id in SELECTED_STREET_DIVS.items()]
+                                  children=INITIAL_STATE[corridor_orientation])
+                         for corridor_orientation, div_id in SELECTED_STREET_DIVS.items()]
                       ])
 
 
@@ -583,13 +1913,54 @@ app.layout = html.Div([html.Div(children=[html.H1(children=TITLE, id='title')],
               [Input('tabs', 'value')])
 def display_streets(value):
     '''Switch tabs display while retaining frontend client-side'''
-    if value == 'ew':
+    if value in ORIENTATIONS:
         return {'display':'inline'}
-    elif value == 'ns':
+    else:
+        return {'display':'none'}
+
+@app.callback(Output(LAYOUTS['heatmap'], 'style'),
+              [Input('tabs', 'value')])
+def display_heatmap(value):
+    if value == HEATMAP_TAB:
         return {'display':'inline'}
     else:
         return {'display':'none'}
 
+@app.callback(Output('title', 'children'),
+              [Input(CORRIDOR_DROPDOWN, 'value')])
+def update_title(corridor):
+    return CORRIDORS[corridor].title
+
+@app.callback(Output('tabs', 'children'),
+              [Input(CORRIDOR_DROPDOWN, 'value')])
+def update_tabs(corridor):
+    '''Show a tab for each orientation of the selected corridor'''
+    return generate_tabs(corridor)
+
+@app.callback(Output('tabs', 'value'),
+              [Input(CORRIDOR_DROPDOWN, 'value')],
+              [State('tabs', 'value')])
+def update_tab_value(corridor, orientation):
+    '''Keep the current tab if the selected corridor has it, otherwise select its first tab'''
+    if orientation in CORRIDORS[corridor].streets or orientation == HEATMAP_TAB:
+        return orientation
+    return next(iter(CORRIDORS[corridor].streets))
+
+@app.callback([Output(CONTROLS['date_picker'], 'min_date_allowed'),
+               Output(CONTROLS['date_picker'], 'max_date_allowed'),
+               Output(CONTROLS['date_picker'], 'date')],
+              [Input(CORRIDOR_DROPDOWN, 'value')])
+def update_date_picker(corridor):
+    '''Limit the date picker to the dates with data for the selected corridor'''
+    daterange = get_corridor_data(corridor).daterange
+    return daterange[0], daterange[1], daterange[1]
+
+@app.callback(Output(CONTROLS['day_types'], 'options'),
+              [Input(CORRIDOR_DROPDOWN, 'value')])
+def generate_day_type_options(corridor):
+    return [{'label': day_type, 'value': day_type}
+            for day_type in get_corridor_data(corridor).timeperiods['day_type'].unique()]
+
 @app.callback(Output(CONTROLS['div_id'], 'style'),
               [Input(CONTROLS['toggle'], 'n_clicks')],
               state=[State(CONTROLS['toggle'], 'children')]
@@ -613,37 +1984,41 @@ def change_button_text(n_clicks, current_toggle):
 @app.callback(Output(CONTROLS['timeperiods'], 'options'),
               [Input(CONTROLS['date_picker'], 'date'),
                Input(CONTROLS['day_types'], 'value'),
-               Input(CONTROLS['date_range_type'], 'value')]) 
-def generate_radio_options(selected_date, day_type='Weekday', daterange_type=0):
+               Input(CONTROLS['date_range_type'], 'value'),
+               Input(CORRIDOR_DROPDOWN, 'value')]) 
+def generate_radio_options(selected_date, day_type='Weekday', daterange_type=0, corridor=DEFAULT_CORRIDOR):
     '''Assign time period radio button options based on select day type
     '''
     if DATERANGE_TYPES[daterange_type] == 'Select Date':
         selected_date = datetime.strptime(selected_date, '%Y-%m-%d').date()
         return [{'label': period, 'value': period}
                 for period
-                in get_timeperiods_for_date(selected_date)]
+                in get_timeperiods_for_date(selected_date, corridor)]
     else:
+        timeperiods = get_corridor_data(corridor).timeperiods
         return [{'label': period, 'value': period}
                 for period
-                in TIMEPERIODS[TIMEPERIODS['day_type'] == day_type]['period']]
+                in timeperiods[timeperiods['day_type'] == day_type]['period']]
 
 @app.callback(Output(CONTROLS['timeperiods'], 'value'),
               [Input(CONTROLS['date_picker'], 'date'),
-               Input(CONTROLS['day_types'], 'value')],
+               Input(CONTROLS['day_types'], 'value'),
+               Input(CORRIDOR_DROPDOWN, 'value')],
               [State(CONTROLS['timeperiods'], 'value' ), 
                State(CONTROLS['date_range_type'], 'value')])
-def assign_default_timperiod(selected_date, day_type='Weekday',
+def assign_default_timperiod(selected_date, day_type='Weekday', corridor=DEFAULT_CORRIDOR,
                              current_timeperiod='AM Peak', daterange_type=0):
     '''Assign the time period radio button selected option based on selected day type
     '''
     if DATERANGE_TYPES[daterange_type] == 'Select Date':
         selected_date = datetime.strptime(selected_date, '%Y-%m-%d').date()
-        available_timeperiods = get_timeperiods_for_date(selected_date)
+        available_timeperiods = get_timeperiods_for_date(selected_date, corridor)
         if current_timeperiod in available_timeperiods:
             return current_timeperiod
         else:
             return available_timeperiods[-1]
-    return TIMEPERIODS[TIMEPERIODS['day_type'] == day_type].iloc[0]['period']
+    timeperiods = get_corridor_data(corridor).timeperiods
+    return timeperiods[timeperiods['day_type'] == day_type].iloc[0]['period']
 
 
 @app.callback(Output(CONTROLS['day_types'], 'value'),
@@ -660,32 +2035,57 @@ def update_day_type(date_picked, daterange_type, day_type):
     else:
         return day_type 
 
-@app.callback(Output(TABLE_DIV_ID, 'children'),
+@app.callback([Output(TABLE_DIV_ID, 'children'),
+               Output(NAVIGATION['table_delta'], 'data'),
+               Output(NAVIGATION['table_displayed'], 'data')],
               [Input(CONTROLS['timeperiods'], 'value'),
                Input(CONTROLS['day_types'], 'value'),
                Input(CONTROLS['date_range_type'], 'value'),
                Input(CONTROLS['date_range'], 'value'),
                Input(CONTROLS['date_picker'], 'date'),
-               Input('tabs', 'value')],
+               Input('tabs', 'value'),
+               Input(CORRIDOR_DROPDOWN, 'value')],
+              [State(NAVIGATION['table_displayed'], 'data')] +
               [State(div_id, 'children') for div_id in SELECTED_STREET_DIVS.values()])
-def update_table(period, day_type, daterange_type, date_range_id, date_picked=datetime.today().date(), orientation='ew',  *state_data):
+def update_table(period, day_type, daterange_type, date_range, date_picked=datetime.today().date(), orientation='ew',
+                 corridor=DEFAULT_CORRIDOR, displayed=None, *state_data):
     '''Generate HTML table of before-after travel times based on selected
-    day type, time period, and remember which row was previously selected
+    day type, time period, and remember which row was previously selected.
+    When only stepping to another date range, send the cells that changed for
+    the table to be patched in the browser instead.
     '''
     LOGGER.debug('Update table: daterange_type:' + str(daterange_type) 
                  + ', period ' + str(period)
                  + ', day_type ' + str(day_type) 
-                 + ', date_range_id ' + str(date_range_id) 
-                 + ', orientation  ' + str(orientation)     )
-    if daterange_type == 1:
-        date_range_id = datetime.strptime(date_picked, '%Y-%m-%d').date()
-    state_index = list(STREETS.keys()).index(orientation)
+                 + ', date_range_id ' + str(date_range) 
+                 + ', orientation  ' + str(orientation)
+                 + ', corridor ' + str(corridor))
+    if orientation not in CORRIDORS[corridor].streets:
+        # Tabs haven't caught up with the selected corridor yet
+        raise PreventUpdate
+    date_range_id = selected_date_range(daterange_type, date_range, date_picked)
+    corridor_data = get_corridor_data(corridor)
+    version = corridor_data.version
+    view = [corridor, orientation, day_type, period, daterange_type]
+    now_displayed = dict(view=view, date_range=date_range, date_picked=date_picked, version=version)
+
+    if navigating(displayed, view, version):
+        previous_id = selected_date_range(daterange_type, displayed['date_range'], displayed['date_picked'])
+        delta = table_delta(table_cells(day_type, period, orientation, daterange_type, previous_id, corridor,
+                                        version),
+                            table_cells(day_type, period, orientation, daterange_type, date_range_id, corridor,
+                                        version))
+        LOGGER.debug('Table cells changed: %s', len(delta['cells']))
+        return dash.no_update, delta, now_displayed
+
+    state_index = list(SELECTED_STREET_DIVS.keys()).index((corridor, orientation))
     selected_street = state_data[state_index]
 
     table = generate_table(selected_street, day_type, period,
                            orientation=orientation,
                            daterange_type=daterange_type,
-                           date_range_id=date_range_id)
+                           date_range_id=date_range_id,
+                           corridor=corridor)
     if daterange_type == 0:
         LOGGER.debug('Table returned for Last Day')
     elif  daterange_type == 1:
@@ -693,12 +2093,12 @@ def update_table(period, day_type, daterange_type, date_range_id, date_picked=da
     elif daterange_type == 2:
         LOGGER.debug('Table returned for Week')
 
-    return table
+    return table, dash.no_update, now_displayed
 
 @app.callback(Output(CONTROLS['date_range_span'], 'style'),
               [Input(CONTROLS['date_range_type'], 'value')])
 def hide_reveal_date_range(daterange_type):
-    if daterange_type > 1:
+    if DATERANGE_TYPES[daterange_type] in ['Select Week', 'Select Month']:
         return {'display':'inline'}
     else:
         return {'display':'none'}
@@ -722,45 +2122,54 @@ def hide_reveal_date_picker(daterange_type):
         return {'display':'none'}
 
 @app.callback(Output(CONTROLS['date_range'], 'options'),
-              [Input(CONTROLS['date_range_type'], 'value')])
-def generate_date_range_for_type(daterange_type):
-    return generate_date_ranges(daterange_type=daterange_type)
+              [Input(CONTROLS['date_range_type'], 'value'),
+               Input(CORRIDOR_DROPDOWN, 'value')])
+def generate_date_range_for_type(daterange_type, corridor):
+    return generate_date_ranges(daterange_type=daterange_type, corridor=corridor)
 
 @app.callback(Output(CONTROLS['date_range'], 'value'),
-              [Input(CONTROLS['date_range_type'], 'value')],
+              [Input(CONTROLS['date_range_type'], 'value'),
+               Input(CORRIDOR_DROPDOWN, 'value')],
               [State(CONTROLS['date_range'], 'value')])
-def update_date_range_value(daterange_type, date_range_id):
+def update_date_range_value(daterange_type, corridor, date_range_id):
     if daterange_type == 1:
         date_range_id
-    if not RANGES[daterange_type].empty and date_range_id <= len(RANGES[daterange_type]):
+    ranges = get_corridor_data(corridor).ranges
+    if not ranges[daterange_type].empty and date_range_id <= len(ranges[daterange_type]):
         return date_range_id
     else:
         return 1
 
 
 
-def create_row_update_function(streetname, orientation):
+def create_row_update_function(streetname, orientation, corridor):
     '''Create a callback function for a given streetname
-    streetname is the id for the row in the datatable
+    The id for the row in the datatable is created from the corridor and streetname
 
     '''
-    @app.callback(Output(streetname, 'className'),
-                  [Input(SELECTED_STREET_DIVS[orientation], 'children')])
+    row_id = street_row_id(corridor, streetname)
+
+    @app.callback(Output(row_id, 'className'),
+                  [Input(SELECTED_STREET_DIVS[(corridor, orientation)], 'children')])
     def update_clicked_row(street):
-        '''Inner function to update row with id=streetname
+        '''Inner function to update row with id=row_id
         '''
         if street:
             return generate_row_class(streetname == street)
         else:
             return generate_row_class(False)
-    update_clicked_row.__name__ = 'update_row_'+streetname+'_'+orientation
+    update_clicked_row.__name__ = 'update_row_'+row_id+'_'+orientation
     return update_clicked_row
 
-[create_row_update_function(street, orientation) for orientation in STREETS for street in STREETS[orientation]]
+[create_row_update_function(street, orientation, corridor)
+ for corridor, orientation in SELECTED_STREET_DIVS for street in CORRIDORS[corridor].streets[orientation]]
 
-def create_row_click_function(orientation):
-    @app.callback(Output(SELECTED_STREET_DIVS[orientation], 'children'),
-                  [Input(street,'n_clicks') for street in STREETS[orientation]]
+def create_row_click_function(corridor, orientation):
+    streets = CORRIDORS[corridor].streets[orientation]
+    row_ids = OrderedDict((street_row_id(corridor, street), street) for street in streets)
+
+    @app.callback(Output(SELECTED_STREET_DIVS[(corridor, orientation)], 'children'),
+                  [Input(row_id,'n_clicks') for row_id in row_ids]
                   )
     def row_click(*args):
         '''Detect which row was clicked and update the graphs to be for the selected street
@@ -769,34 +2178,39 @@ def create_row_click_function(orientation):
         the current state. Previous state is stored in a json in a hidden div
         '''
         ctx = dash.callback_context
-        selected_street = ctx.triggered[0]['prop_id'].split('.')[0]
+        selected_street = row_ids[ctx.triggered[0]['prop_id'].split('.')[0]]
 
         LOGGER.debug('This street was clicked: %s', selected_street)
 
         return selected_street
 
-    row_click.__name__ = 'row_click_'+orientation
+    row_click.__name__ = 'row_click_'+corridor+'_'+orientation
     return row_click
 
-[create_row_click_function(orientation) for orientation in STREETS.keys()]
+[create_row_click_function(corridor, orientation) for corridor, orientation in SELECTED_STREET_DIVS]
 
 def create_update_street_name(dir_id):
     @app.callback(Output(STREETNAME_DIV[dir_id], 'children'),
                   [*[Input(div_id, 'children') for div_id in SELECTED_STREET_DIVS.values()],
-                   Input('tabs', 'value')])
+                   Input('tabs', 'value'),
+                   Input(CORRIDOR_DROPDOWN, 'value')])
     def update_street_name(*args):
         #Use the input for the selected street from the orientation of the current tab
-        *selected_streets, orientation = args
+        *selected_streets, orientation, corridor = args
         LOGGER.debug('update_street_name() Selected streets: %s \n Selected tab: %s', selected_streets, orientation)
-        street = selected_streets[list(SELECTED_STREET_DIVS.keys()).index(orientation)]
+        if orientation not in CORRIDORS[corridor].streets:
+            raise PreventUpdate
+        street = selected_streets[list(SELECTED_STREET_DIVS.keys()).index((corridor, orientation))]
+        direction = CORRIDORS[corridor].directions[orientation][dir_id]
+        baseline = get_corridor_data(corridor).baseline
         try:
-            from_to = BASELINE[(BASELINE['street'] == street) &
-                               (BASELINE['direction'] == DIRECTIONS[orientation][dir_id])][['from_intersection',
-                                                                               'to_intersection']].iloc[0]
+            from_to = baseline[(baseline['street'] == street) &
+                               (baseline['direction'] == direction)][['from_intersection',
+                                                                      'to_intersection']].iloc[0]
         except IndexError:
             return html.Div(className = 'nodata')
         else:
-            return [html.B(street + ' ' + DIRECTIONS[orientation][dir_id] + ': '),
+            return [html.B(street + ' ' + direction + ': '),
                     from_to['from_intersection'] + ' - ' + from_to['to_intersection']]
 
 [create_update_street_name(i) for i in [0,1]]
@@ -804,53 +2218,188 @@ def create_update_street_name(dir_id):
 def create_update_graph_div(graph_number):
     '''Dynamically create callback functions to update graphs based on a graph number
     '''
-    @app.callback(Output(GRAPHDIVS[graph_number], 'children'),
+    @app.callback([Output(GRAPHDIVS[graph_number], 'children'),
+                   Output(NAVIGATION['graph_deltas'][graph_number], 'data'),
+                   Output(NAVIGATION['graph_displayed'][graph_number], 'data')],
                   [Input(CONTROLS['timeperiods'], 'value'),
                    Input(CONTROLS['day_types'], 'value'),
                    Input('tabs', 'value'),
+                   Input(CORRIDOR_DROPDOWN, 'value'),
+                   Input(CONTROLS['date_range_type'], 'value'),
+                   Input(CONTROLS['date_range'], 'value'),
+                   Input(CONTROLS['date_picker'], 'date'),
+                   Input(CONTROLS['overlays'], 'value'),
                    *[Input(div_id, 'children') for div_id in SELECTED_STREET_DIVS.values()]],
-                  [State(CONTROLS['date_range_type'], 'value'),
-                   State(CONTROLS['date_range'], 'value'),
-                   State(CONTROLS['date_picker'], 'date')])
-    def update_graph(period, day_type, orientation, *args):
+                  [State(NAVIGATION['graph_displayed'][graph_number], 'data')])
+    def update_graph(period, day_type, orientation, corridor, daterange_type, date_range, date_picked,
+                     overlays, *args):
         '''Update the graph for a street direction based on the selected:
          - street
          - time period
          - day type
+         - corridor
+         - date range
+         - overlays
+        When only stepping to another date range, send the traces that
+        changed for the figure to be patched in the browser instead.
         '''
-        *selected_streets, daterange_type, date_range, date_picked = args
+        *selected_streets, displayed = args
+        if orientation not in CORRIDORS[corridor].streets:
+            raise PreventUpdate
         #Use the input for the selected street from the orientation of the current tab
-        if daterange_type == 1:
-            date_range = datetime.strptime(date_picked, '%Y-%m-%d').date()
+        date_range_id = selected_date_range(daterange_type, date_range, date_picked)
         
-        street = selected_streets[list(SELECTED_STREET_DIVS.keys()).index(orientation)]
+        street = selected_streets[list(SELECTED_STREET_DIVS.keys()).index((corridor, orientation))]
         LOGGER.debug('Updating graph %s, for street: %s, period: %s, day_type: %s, daterange_type: %s, date_range: %s',
-                     GRAPHS[graph_number], street, period, day_type, daterange_type, date_range)
-        figure = generate_figure(street,
-                                 DIRECTIONS[orientation][graph_number],
-                                 period=period,
-                                 day_type=day_type,
-                                 daterange_type=daterange_type,
-                                 date_range_id=date_range)
+                     GRAPHS[graph_number], street, period, day_type, daterange_type, date_range_id)
+        direction = CORRIDORS[corridor].directions[orientation][graph_number]
+        overlays = tuple(overlays or [])
+        corridor_data = get_corridor_data(corridor)
+        version = corridor_data.version
+        view = [corridor, orientation, street, day_type, period, daterange_type, list(overlays)]
+        figure = figure_json(street, direction, day_type, period, daterange_type, date_range_id, overlays, corridor,
+                             version)
+        now_displayed = dict(view=view, date_range=date_range, date_picked=date_picked, version=version,
+                             figure=figure is not None)
+
+        if figure and navigating(displayed, view, version) and displayed['figure']:
+            previous_id = selected_date_range(daterange_type, displayed['date_range'], displayed['date_picked'])
+            previous = figure_json(street, direction, day_type, period, daterange_type, previous_id, overlays,
+                                   corridor, version)
+            if previous:
+                return dash.no_update, figure_delta(previous, figure), now_displayed
         if figure: 
-            return html.Div(dcc.Graph(id = GRAPHS[graph_number],
-                                      figure = figure,
-                                      config={'displayModeBar': False}))
+            return (html.Div(dcc.Graph(id = GRAPHS[graph_number],
+                                       figure = figure,
+                                       config={'displayModeBar': False})),
+                    dash.no_update, now_displayed)
         else:
-            return html.Div(className = 'nodata')
+            return html.Div(className = 'nodata'), dash.no_update, now_displayed
 
     update_graph.__name__ = 'update_graph_' + GRAPHS[graph_number]
     return update_graph
 
 [create_update_graph_div(i) for i in range(len(GRAPHS))]
 
+# Patch the table and graphs in the browser with the changes sent when
+# stepping through date ranges, see assets/navigation.js
+app.clientside_callback(ClientsideFunction('navigation', 'patch_table'),
+                        Output(TABLE_ID, 'children'),
+                        [Input(NAVIGATION['table_delta'], 'data')],
+                        [State(TABLE_ID, 'children')])
+
+for graph, delta_store in zip(GRAPHS, NAVIGATION['graph_deltas']):
+    app.clientside_callback(ClientsideFunction('navigation', 'patch_figure'),
+                            Output(graph, 'figure'),
+                            [Input(delta_store, 'data')],
+                            [State(graph, 'figure')])
+
+@app.callback(Output(DRILLDOWN['date'], 'children'),
+              [Input(GRAPHS[0], 'clickData'),
+               Input(GRAPHS[1], 'clickData'),
+               Input(CONTROLS['date_picker'], 'date')])
+def update_drilldown_date(*args):
+    '''Drill down into the day clicked on either graph, or picked with the
+    date picker
+    '''
+    triggered = dash.callback_context.triggered[0]
+    if triggered['value'] is None:
+        # The graphs were redrawn
+        raise PreventUpdate
+    if triggered['prop_id'].endswith('clickData'):
+        return str(triggered['value']['points'][0]['x'])[:10]
+    return triggered['value'][:10]
+
+@app.callback(Output(DRILLDOWN['graph_div'], 'children'),
+              [Input(DRILLDOWN['date'], 'children'),
+               Input(DRILLDOWN['resolution'], 'value'),
+               Input(CONTROLS['timeperiods'], 'value'),
+               Input('tabs', 'value'),
+               Input(CORRIDOR_DROPDOWN, 'value'),
+               *[Input(div_id, 'children') for div_id in SELECTED_STREET_DIVS.values()]])
+def update_drilldown(selected_date, minutes, period, orientation, corridor, *selected_streets):
+    '''Update the drill-down graph of the selected street for the selected
+    date, or the most recent day with sub-daily data
+    '''
+    if orientation not in CORRIDORS[corridor].streets:
+        raise PreventUpdate
+    street = selected_streets[list(SELECTED_STREET_DIVS.keys()).index((corridor, orientation))]
+    if selected_date is None:
+        subdaily = get_subdaily(corridor)
+        if subdaily.n_days == 0:
+            return html.Div(className = 'nodata')
+        selected_date = str(subdaily.start + subdaily.n_days - 1)
+    LOGGER.debug('Updating drill-down for street: %s, date: %s, period: %s, minutes: %s',
+                 street, selected_date, period, minutes)
+    figure = generate_drilldown(street, orientation, selected_date, period, minutes, corridor)
+    if figure:
+        return [html.H2([html.B(street + ': '),
+                         datetime.strptime(selected_date, '%Y-%m-%d').strftime('%a %b %d')]),
+                dcc.Graph(id=DRILLDOWN['graph'], figure=figure, config={'displayModeBar': False})]
+    else:
+        return html.Div(className = 'nodata')
+
+@app.callback(Output(HEATMAP['day_types'], 'options'),
+              [Input(CORRIDOR_DROPDOWN, 'value')])
+def generate_heatmap_day_type_options(corridor):
+    return [{'label': day_type, 'value': day_type}
+            for day_type in get_corridor_data(corridor).timeperiods['day_type'].unique()]
+
+@app.callback(Output(HEATMAP['timeperiods'], 'options'),
+              [Input(HEATMAP['day_types'], 'value'),
+               Input(CORRIDOR_DROPDOWN, 'value')])
+def generate_heatmap_radio_options(day_type, corridor):
+    timeperiods = get_corridor_data(corridor).timeperiods
+    return [{'label': period, 'value': period}
+            for period
+            in timeperiods[timeperiods['day_type'] == day_type]['period']]
+
+@app.callback(Output(HEATMAP['timeperiods'], 'value'),
+              [Input(HEATMAP['day_types'], 'value'),
+               Input(CORRIDOR_DROPDOWN, 'value')],
+              [State(HEATMAP['timeperiods'], 'value')])
+def assign_default_heatmap_timeperiod(day_type, corridor, current_timeperiod):
+    '''Keep the selected time period if the day type has it, otherwise select its first'''
+    timeperiods = get_corridor_data(corridor).timeperiods
+    timeperiods = timeperiods[timeperiods['day_type'] == day_type]['period']
+    if current_timeperiod in timeperiods.values:
+        return current_timeperiod
+    return timeperiods.iloc[0]
+
+@app.callback([Output(HEATMAP['date_range'], 'min_date_allowed'),
+               Output(HEATMAP['date_range'], 'max_date_allowed'),
+               Output(HEATMAP['date_range'], 'start_date'),
+               Output(HEATMAP['date_range'], 'end_date')],
+              [Input(CORRIDOR_DROPDOWN, 'value')])
+def update_heatmap_date_range(corridor):
+    '''Limit the heatmap dates to those with data for the selected corridor'''
+    daterange = get_corridor_data(corridor).daterange
+    return (daterange[0], daterange[1],
+            max(daterange[0], daterange[1] - relativedelta(days=HEATMAP_DAYS)), daterange[1])
+
+@app.callback(Output(HEATMAP['graph'], 'figure'),
+              [Input(HEATMAP['day_types'], 'value'),
+               Input(HEATMAP['timeperiods'], 'value'),
+               Input(HEATMAP['date_range'], 'start_date'),
+               Input(HEATMAP['date_range'], 'end_date'),
+               Input(CORRIDOR_DROPDOWN, 'value')])
+def update_heatmap(day_type, period, start_date, end_date, corridor):
+    '''Update the heatmap of all streets for the selected day type, time
+    period and dates
+    '''
+    LOGGER.debug('Updating heatmap for period: %s, day_type: %s, start_date: %s, end_date: %s, corridor: %s',
+                 period, day_type, start_date, end_date, corridor)
+    return generate_heatmap(day_type, period, start_date[:10], end_date[:10], corridor)
+
 @app.callback(Output(TIMEPERIOD_DIV, 'children'),
               [Input(CONTROLS['timeperiods'], 'value'),
-               Input(CONTROLS['day_types'], 'value')])
-def update_timeperiod(timeperiod, day_type):
+               Input(CONTROLS['day_types'], 'value')],
+              [State(CORRIDOR_DROPDOWN, 'value')])
+def update_timeperiod(timeperiod, day_type, corridor):
     '''Update sub title text based on selected time period and day type
     '''
-    time_range = TIMEPERIODS[(TIMEPERIODS['period'] == timeperiod) & (TIMEPERIODS['day_type'] == day_type)].iloc[0]['period_range']
+    timeperiods = get_corridor_data(corridor).timeperiods
+    time_range = timeperiods[(timeperiods['period'] == timeperiod) & (timeperiods['day_type'] == day_type)].iloc[0]['period_range']
     return day_type + ' ' + timeperiod + ' ' + time_range
 
 
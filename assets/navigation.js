@@ -0,0 +1,57 @@
+/* Patch the table and graphs with the changes the server sends when stepping
+   through date ranges, see update_table and update_graph in app.py */
+(function() {
+    function withProps(component, props) {
+        return Object.assign({}, component, {props: Object.assign({}, component.props, props)});
+    }
+
+    function withCells(row, patch) {
+        return withProps(row, {children: row.props.children.map(patch)});
+    }
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        navigation: {
+            // Cells are [street row, direction, text, class], street rows
+            // following the two header rows and the pilot cell of direction
+            // i being cell 2i + 1 of its row, after the street name
+            patch_table: function(delta, rows) {
+                if (!delta || !rows) {
+                    return rows;
+                }
+                var changed = {};
+                delta.cells.forEach(function(cell) {
+                    changed[cell[0]] = changed[cell[0]] || {};
+                    changed[cell[0]][cell[1]] = cell;
+                });
+                return rows.map(function(row, index) {
+                    if (index === 1 && delta.header !== null) {
+                        // Headers of the pilot columns
+                        return withCells(row, function(td, i) {
+                            return i % 2 === 1 ? withProps(td, {children: delta.header}) : td;
+                        });
+                    }
+                    var cells = changed[index - 2];
+                    if (!cells) {
+                        return row;
+                    }
+                    return withCells(row, function(td, i) {
+                        var cell = i % 2 === 1 ? cells[(i - 1) / 2] : undefined;
+                        return cell ? withProps(td, {children: cell[2], className: cell[3]}) : td;
+                    });
+                });
+            },
+
+            patch_figure: function(delta, figure) {
+                if (!delta || !figure) {
+                    return figure || {data: [], layout: {}};
+                }
+                var data = figure.data.slice(0, delta.n_traces);
+                Object.keys(delta.traces).forEach(function(i) {
+                    var trace = delta.traces[i];
+                    data[i] = trace.replace ? trace.keys : Object.assign({}, data[i], trace.keys);
+                });
+                return Object.assign({}, figure, {data: data, layout: delta.layout || figure.layout});
+            }
+        }
+    });
+})();
@@ -0,0 +1,188 @@
+'''Compare the throughput of the dashboard under sync and threaded workers
+
+Starts the app under gunicorn with the same number of worker processes, and
+so the same copies of the data in memory, first with sync workers serving one
+request at a time each, then with gthread workers serving several. Concurrent
+clients then send a mix of table and graph updates, over every date range type
+and time period of the default corridor, and the requests served per second,
+their latency and the memory of the workers are reported for each.
+
+    python benchmark.py [--workers 2] [--threads 4] [--clients 8] [--requests 400]
+
+Needs the same database connection as the app, and Linux to report memory.
+'''
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import cycle, islice
+from urllib.error import URLError
+from urllib.request import Request, urlopen
+
+import numpy as np
+
+from memory_check import date_range_ids
+
+
+def callback_request(outputs, inputs, state=()):
+    '''Body of a request to the Dash callback for outputs'''
+    return json.dumps({'output': outputs[0] if len(outputs) == 1 else '..' + '...'.join(outputs) + '..',
+                       'inputs': [dict(id=id_, property=prop, value=value) for id_, prop, value in inputs],
+                       'state': [dict(id=id_, property=prop, value=value) for id_, prop, value in state],
+                       'changedPropIds': [inputs[0][0] + '.' + inputs[0][1]]}).encode()
+
+
+def update_requests(app):
+    '''Bodies of table and graph update requests for every date range type and
+    time period of the first tab of the default corridor
+    '''
+    corridor = app.DEFAULT_CORRIDOR
+    corridor_data = app.get_corridor_data(corridor)
+    orientation = next(iter(app.CORRIDORS[corridor].streets))
+    selected_streets = [(div_id, 'children', app.INITIAL_STATE[corridor_orientation])
+                        for corridor_orientation, div_id in app.SELECTED_STREET_DIVS.items()]
+    bodies = []
+    for daterange_type, date_range_id in date_range_ids(corridor_data).items():
+        daterange_type = app.DATERANGE_TYPES.index(daterange_type)
+        date_picked = str(corridor_data.daterange[1])
+        timeperiods = corridor_data.timeperiods
+        if daterange_type == 1:
+            # As the app selects, the day type and time periods of the date picked
+            timeperiods = timeperiods[(timeperiods['day_type'] == ('Weekend' if date_range_id.weekday() > 4
+                                                                   else 'Weekday')) &
+                                      timeperiods['period'].isin(app.get_timeperiods_for_date(date_range_id,
+                                                                                              corridor))]
+            date_picked, date_range_id = str(date_range_id), 1
+        for timeperiod in timeperiods.itertuples():
+            controls = [(app.CONTROLS['timeperiods'], 'value', timeperiod.period),
+                        (app.CONTROLS['day_types'], 'value', timeperiod.day_type),
+                        (app.CONTROLS['date_range_type'], 'value', daterange_type),
+                        (app.CONTROLS['date_range'], 'value', int(date_range_id)),
+                        (app.CONTROLS['date_picker'], 'date', date_picked)]
+            # Nothing displayed yet, so that the table and graphs are sent whole
+            bodies.append(callback_request([app.TABLE_DIV_ID + '.children',
+                                            app.NAVIGATION['table_delta'] + '.data',
+                                            app.NAVIGATION['table_displayed'] + '.data'],
+                                           controls + [('tabs', 'value', orientation),
+                                                       (app.CORRIDOR_DROPDOWN, 'value', corridor)],
+                                           [(app.NAVIGATION['table_displayed'], 'data', None)] + selected_streets))
+            for graph_div, delta, displayed in zip(app.GRAPHDIVS, app.NAVIGATION['graph_deltas'],
+                                                   app.NAVIGATION['graph_displayed']):
+                bodies.append(callback_request([graph_div + '.children', delta + '.data', displayed + '.data'],
+                                               controls[:2] + [('tabs', 'value', orientation),
+                                                               (app.CORRIDOR_DROPDOWN, 'value', corridor)] +
+                                               controls[2:] + [(app.CONTROLS['overlays'], 'value', [])] +
+                                               selected_streets,
+                                               [(displayed, 'data', None)]))
+    return bodies
+
+
+def start_server(app_module, port, worker_class, workers, threads):
+    '''Start gunicorn and wait until every worker has loaded the app'''
+    server = subprocess.Popen([sys.executable, '-m', 'gunicorn', app_module,
+                               '--bind', '127.0.0.1:' + str(port),
+                               '--worker-class', worker_class,
+                               '--workers', str(workers),
+                               '--threads', str(threads),
+                               '--timeout', '600',
+                               '--log-level', 'warning'])
+    while True:
+        try:
+            urlopen('http://127.0.0.1:{}/_dash-layout'.format(port), timeout=600).read()
+            break
+        except (URLError, ConnectionError):
+            if server.poll() is not None:
+                raise RuntimeError('gunicorn exited with code {}'.format(server.returncode))
+            time.sleep(1)
+    while len(worker_pids(server.pid)) < workers:
+        time.sleep(1)
+    return server
+
+
+def worker_pids(server_pid):
+    '''Processes started by the gunicorn server'''
+    pids = []
+    for pid in os.listdir('/proc'):
+        if pid.isdigit():
+            try:
+                with open('/proc/{}/stat'.format(pid)) as stat:
+                    if int(stat.read().rsplit(')', 1)[1].split()[1]) == server_pid:
+                        pids.append(int(pid))
+            except (OSError, IndexError):
+                pass
+    return pids
+
+
+def resident_mb(pids):
+    '''Total resident memory of processes, in MB'''
+    total = 0
+    for pid in pids:
+        with open('/proc/{}/status'.format(pid)) as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    total += int(line.split()[1])
+    return total / 1024
+
+
+def post(port, body):
+    '''Send a callback request, returning its latency in seconds'''
+    start = time.perf_counter()
+    request = Request('http://127.0.0.1:{}/_dash-update-component'.format(port), data=body,
+                      headers={'Content-Type': 'application/json'})
+    urlopen(request, timeout=600).read()
+    return time.perf_counter() - start
+
+
+def run(port, bodies, clients, n_requests):
+    '''Send n_requests from concurrent clients
+    Returns the requests per second and the latencies in seconds
+    '''
+    with ThreadPoolExecutor(clients) as executor:
+        # Every worker loads what it needs on its first requests
+        list(executor.map(lambda body: post(port, body), bodies * 2))
+        start = time.perf_counter()
+        latencies = list(executor.map(lambda body: post(port, body), islice(cycle(bodies), n_requests)))
+    return n_requests / (time.perf_counter() - start), np.array(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--app', default='app:server', help='gunicorn app module')
+    parser.add_argument('--port', type=int, default=8050)
+    parser.add_argument('--workers', type=int, default=2, help='worker processes in both modes')
+    parser.add_argument('--threads', type=int, default=4, help='threads of each gthread worker')
+    parser.add_argument('--clients', type=int, default=8, help='concurrent clients')
+    parser.add_argument('--requests', type=int, default=400, help='requests to time in each mode')
+    args = parser.parse_args()
+
+    import app
+    bodies = update_requests(app)
+
+    results = []
+    for worker_class, threads in [('sync', 1), ('gthread', args.threads)]:
+        server = start_server(args.app, args.port, worker_class, args.workers, threads)
+        try:
+            throughput, latencies = run(args.port, bodies, args.clients, args.requests)
+            memory = resident_mb(worker_pids(server.pid))
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait()
+        results.append((worker_class, threads, throughput, latencies, memory))
+
+    print('{:<10} {:>8} {:>10} {:>10} {:>10} {:>12}'.format('Workers', 'Threads', 'Req/s', 'p50 ms',
+                                                           'p95 ms', 'Memory MB'))
+    for worker_class, threads, throughput, latencies, memory in results:
+        print('{:<10} {:>8} {:>10.1f} {:>10.0f} {:>10.0f} {:>12.0f}'.format(
+            worker_class, threads, throughput, np.percentile(latencies, 50) * 1000,
+            np.percentile(latencies, 95) * 1000, memory))
+    print('Throughput of gthread workers: {:.2f}x sync, with {} worker processes each'.format(
+        results[1][2] / results[0][2], args.workers))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
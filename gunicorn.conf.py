@@ -0,0 +1,31 @@
+'''Gunicorn settings for serving the dashboard, read by gunicorn from the
+working directory
+
+Workers are sync by default, serving one request at a time. Callbacks only
+read immutable snapshots of the data, so each worker process can instead serve
+several requests at once on threads (or gevent greenlets), sharing one copy of
+the data rather than loading it again in another process. Run benchmark.py on
+the deployment host before switching: in memory mode, where callbacks are
+bound by pandas holding the GIL, gthread workers can be slower than sync.
+
+    WEB_CONCURRENCY        worker processes (1)
+    GUNICORN_WORKER_CLASS  sync, gthread or gevent (sync)
+    GUNICORN_THREADS       threads of each gthread worker (4), ignored otherwise
+
+gevent workers need the gevent and psycogreen packages.
+'''
+import os
+
+bind = '0.0.0.0:' + os.getenv('PORT', '8000')
+workers = int(os.getenv('WEB_CONCURRENCY', 1))
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'sync')
+# gunicorn runs sync workers as gthread ones if given more than one thread
+threads = int(os.getenv('GUNICORN_THREADS', 4)) if worker_class == 'gthread' else 1
+timeout = 90
+
+
+def post_fork(server, worker):
+    if server.cfg.worker_class_str == 'gevent':
+        # Let other requests run while one waits on the database
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
@@ -0,0 +1,142 @@
+'''Check the memory used by the dashboard's data and hot callbacks
+
+Reports the size of the data and sub-daily bins loaded for the default
+corridor and the peak memory allocated by a call of each of the functions run
+on every table and graph update, for each date range type. Exits with an error if any of these
+exceed the budgets in memory_budgets.cfg, to catch growth in copies and
+intermediate frames on the live data. tests/test_memory.py checks the same
+budgets for a synthetic corridor on every test run.
+
+    python memory_check.py [--budgets memory_budgets.cfg] [--budget NAME=MB ...]
+
+Needs the same database connection as the app.
+'''
+import argparse
+import configparser
+import sys
+import tracemalloc
+
+MB = 1024 ** 2
+
+
+def start_tracing():
+    '''Restart tracing, so that the peak only covers what follows'''
+    tracemalloc.stop()
+    tracemalloc.start()
+
+
+def peak_of_call(function, *args, **kwargs):
+    '''Peak memory allocated while calling function with args, in bytes'''
+    start_tracing()
+    function(*args, **kwargs)
+    return tracemalloc.get_traced_memory()[1]
+
+
+def dataset_sizes(corridor_data):
+    '''Size in bytes of each structure loaded for a corridor'''
+    sizes = {name: getattr(corridor_data, name).memory_usage(deep=True).sum()
+             for name in ['data', 'baseline', 'weeks', 'months', 'timeperiods']}
+    sizes['heatmap'] = corridor_data.heatmap.diffs.nbytes
+    return sizes
+
+
+def date_range_ids(corridor_data):
+    '''Representative date range id for each date range type'''
+    return {'Last Day': 1,
+            'Select Date': corridor_data.daterange[1],
+            'Select Week': corridor_data.weeks['week_number'].iloc[-1],
+            'Select Month': corridor_data.months['month_number'].iloc[-1],
+            'Full History': 1}
+
+
+def callback_peaks(app):
+    '''Largest peak allocation of a call of each hot function, in bytes, over
+    every date range type for the default corridor
+    '''
+    corridor = app.DEFAULT_CORRIDOR
+    corridor_data = app.get_corridor_data(corridor)
+    orientation = next(iter(app.CORRIDORS[corridor].streets))
+    street = app.CORRIDORS[corridor].streets[orientation][0]
+    direction = app.CORRIDORS[corridor].directions[orientation][0]
+    day_type = corridor_data.timeperiods.iloc[0]['day_type']
+    period = corridor_data.timeperiods.iloc[0]['period']
+    data = corridor_data.data
+    filtered = data[(data['period'] == period) &
+                    (data['day_type'] == day_type) &
+                    (data['direction'].isin(app.CORRIDORS[corridor].directions[orientation]))]
+
+    peaks = {}
+    for daterange_type, date_range_id in date_range_ids(corridor_data).items():
+        daterange_type = app.DATERANGE_TYPES.index(daterange_type)
+        calls = {'filter_table_data': (app.filter_table_data,
+                                       (period, day_type, orientation, daterange_type, date_range_id, corridor)),
+                 'pivot_order': (app.pivot_order,
+                                 (filtered[app.selected_data(filtered, daterange_type, date_range_id)],
+                                  orientation, daterange_type, corridor)),
+                 'generate_table': (app.generate_table,
+                                    (street, day_type, period, orientation, daterange_type, date_range_id, corridor)),
+                 'generate_figure': (app.generate_figure,
+                                     (street, direction, day_type, period, daterange_type, date_range_id,
+                                      list(app.OVERLAYS), corridor))}
+        for name, (function, args) in calls.items():
+            peaks[name] = max(peaks.get(name, 0), peak_of_call(function, *args))
+
+    subdaily = app.get_subdaily(corridor)
+    if subdaily.n_days:
+        last_day = str(subdaily.start + subdaily.n_days - 1)
+        peaks['generate_drilldown'] = max(peak_of_call(app.generate_drilldown, street, orientation, last_day,
+                                                       period, minutes, corridor)
+                                          for minutes in app.DRILLDOWN_RESOLUTIONS)
+    return peaks
+
+
+def load_budgets(path, overrides):
+    '''Budgets in bytes from the BUDGETS section of the config file at path,
+    with overrides given as NAME=MB
+    '''
+    CONFIG = configparser.ConfigParser()
+    CONFIG.read(path)
+    budgets = {name: float(value) * MB for name, value in CONFIG['BUDGETS'].items()}
+    for override in overrides:
+        name, value = override.split('=')
+        budgets[name] = float(value) * MB
+    return budgets
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--budgets', default='memory_budgets.cfg',
+                        help='config file of budgets in MB')
+    parser.add_argument('--budget', action='append', default=[], metavar='NAME=MB',
+                        help='override a budget')
+    args = parser.parse_args()
+    budgets = load_budgets(args.budgets, args.budget)
+
+    tracemalloc.start()
+    import app
+    loaded = tracemalloc.get_traced_memory()[0]
+    corridor_data = app.get_corridor_data(app.DEFAULT_CORRIDOR)
+
+    measured = dataset_sizes(corridor_data)
+    measured['dataset'] = sum(measured.values())
+    measured['app_import'] = loaded
+    measured['subdaily'] = app.get_subdaily(app.DEFAULT_CORRIDOR).tt.nbytes
+    measured.update(callback_peaks(app))
+    tracemalloc.stop()
+
+    exceeded = []
+    print('{:<20} {:>12} {:>12}'.format('', 'MB', 'Budget MB'))
+    for name, size in measured.items():
+        budget = budgets.get(name)
+        print('{:<20} {:>12.2f} {:>12}'.format(name, size / MB,
+                                              '' if budget is None else '{:.2f}'.format(budget / MB)))
+        if budget is not None and size > budget:
+            exceeded.append(name)
+    if exceeded:
+        print('Over budget: ' + ', '.join(exceeded))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,90 @@
+'''Build SQLite stand-ins for the pushdown materialized views
+
+Loads each corridor in memory mode and writes the tables the app queries in
+pushdown mode (see sql/create-mview-dash_pushdown.sql) to one SQLite database
+per schema in a directory, so that pushdown mode can be run and checked
+without creating the views in the database.
+
+    python pushdown_sqlite.py DIRECTORY
+    DATA_BACKEND=pushdown PUSHDOWN_SQLITE=DIRECTORY python app.py
+
+Needs the same database connection as the app.
+'''
+import argparse
+import os
+import sqlite3
+import sys
+
+import pandas as pd
+
+# Columns the views are indexed on in the database
+INDEXES = dict(daily_view=[['street', 'direction', 'day_type', 'period', 'date'],
+                           ['period', 'day_type', 'date'],
+                           ['date']],
+               periods_view=[['period', 'day_type', 'range_type', 'range_id']])
+
+
+def period_averages(app, data):
+    '''Average travel time of each series by week, month and over the pilot,
+    as in dash_periods_mv
+    '''
+    keys = ['street', 'direction', 'day_type', 'period']
+    included = data[data['category'] != 'Excluded']
+    pilot = data[data['category'] == 'Pilot']
+    averages = []
+    for range_type, rows, range_column in [('week', included, 'week_number'),
+                                           ('month', included, 'month_number'),
+                                           ('history', pilot, None)]:
+        if range_column is None:
+            rows = rows.assign(range_id=1)
+        else:
+            rows = rows.dropna(subset=[range_column]).rename(columns={range_column: 'range_id'})
+        averaged = rows.groupby(keys + ['range_id'], as_index=False)['tt'].mean()
+        averaged['tt'] = app.round_tt(averaged['tt'])
+        averaged['range_id'] = averaged['range_id'].astype(int)
+        averages.append(averaged.assign(range_type=range_type))
+    return pd.concat(averages, ignore_index=True)[keys + ['range_type', 'range_id', 'tt']]
+
+
+def pushdown_tables(app, corridor_data):
+    '''Tables to write from the data of a corridor loaded in memory mode,
+    keyed by their names in corridor.tables
+    '''
+    data = corridor_data.data[app.DAILY_COLUMNS].copy()
+    data['above_threshold'] = data['above_threshold'].astype(int)
+    return dict(daily_view=data,
+                periods_view=period_averages(app, corridor_data.data),
+                baseline_view=corridor_data.baseline,
+                weeks=corridor_data.weeks.drop(columns='label'),
+                months=corridor_data.months.drop(columns='label'))
+
+
+def write_tables(directory, corridor, tables):
+    '''Write the tables of a corridor to the database for its schema'''
+    schema = corridor.tables['daily_view'].split('.')[0]
+    con = sqlite3.connect(os.path.join(directory, schema + '.sqlite'))
+    for table, df in tables.items():
+        name = corridor.tables[table].split('.')[-1]
+        df.to_sql(name, con, index=False, if_exists='replace')
+        for columns in INDEXES.get(table, []):
+            con.execute('CREATE INDEX {0}_{1} ON {0} ({2})'.format(name, '_'.join(columns), ', '.join(columns)))
+    con.commit()
+    con.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('directory', help='directory to write a database per schema to')
+    args = parser.parse_args()
+    os.makedirs(args.directory, exist_ok=True)
+
+    os.environ['DATA_BACKEND'] = 'memory'
+    import app
+    for corridor in app.CORRIDORS.values():
+        write_tables(args.directory, corridor, pushdown_tables(app, app.load_corridor_data(corridor)))
+        print('Wrote corridor ' + corridor.name)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
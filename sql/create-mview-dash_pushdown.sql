@@ -0,0 +1,75 @@
+-- Materialized views queried by the dashboard when DATA_BACKEND=pushdown, so that
+-- filtering, aggregating by week and month, and finding the most recent day of
+-- each series happen in the database instead of in every app process.
+--
+-- Create these in the schema of each corridor (replace king_pilot), and refresh
+-- them after each data sync:
+--
+--   REFRESH MATERIALIZED VIEW king_pilot.dash_daily_mv;
+--   REFRESH MATERIALIZED VIEW king_pilot.dash_periods_mv;
+--   REFRESH MATERIALIZED VIEW king_pilot.dash_baseline_mv;
+--
+-- The rolling averages need PostgreSQL 11 or later. The threshold for
+-- above_threshold is THRESHOLD in app.py.
+
+DROP MATERIALIZED VIEW IF EXISTS king_pilot.dash_baseline_mv;
+DROP MATERIALIZED VIEW IF EXISTS king_pilot.dash_periods_mv;
+DROP MATERIALIZED VIEW IF EXISTS king_pilot.dash_daily_mv;
+
+CREATE MATERIALIZED VIEW king_pilot.dash_daily_mv AS
+SELECT street, direction, dt AS date, day_type, category, period, round(daily.tt, 1) tt,
+       CASE WHEN dt = first_value(dt) OVER (PARTITION BY direction, day_type, period ORDER BY dt DESC)
+       THEN 1 ELSE 0 END AS most_recent,
+       week_number, month_number,
+       round(avg(round(daily.tt, 1)) FILTER (WHERE category <> 'Excluded')
+             OVER (PARTITION BY street, direction, day_type, period, category ORDER BY dt
+                   RANGE BETWEEN INTERVAL '6 days' PRECEDING AND CURRENT ROW), 1) AS rolling_7,
+       round(avg(round(daily.tt, 1)) FILTER (WHERE category <> 'Excluded')
+             OVER (PARTITION BY street, direction, day_type, period, category ORDER BY dt
+                   RANGE BETWEEN INTERVAL '27 days' PRECEDING AND CURRENT ROW), 1) AS rolling_28,
+       COALESCE(round(daily.tt, 1) - round(base.tt, 1) > 1, FALSE) AS above_threshold
+FROM king_pilot.dash_daily daily
+LEFT OUTER JOIN king_pilot.pilot_weeks weeks ON dt >= week AND dt < week + INTERVAL '1 week'
+LEFT OUTER JOIN king_pilot.pilot_months months ON dt >= month AND dt < month + INTERVAL '1 month'
+LEFT OUTER JOIN king_pilot.dash_baseline base USING (street, direction, day_type, period);
+
+CREATE INDEX ON king_pilot.dash_daily_mv (street, direction, day_type, period, date);
+CREATE INDEX ON king_pilot.dash_daily_mv (period, day_type, date);
+CREATE INDEX ON king_pilot.dash_daily_mv (period, day_type) WHERE most_recent = 1;
+CREATE INDEX ON king_pilot.dash_daily_mv (date);
+
+-- Average travel time of each series by pilot week, pilot month, and over the
+-- whole pilot (range_type 'history', with range_id 1)
+CREATE MATERIALIZED VIEW king_pilot.dash_periods_mv AS
+SELECT street, direction, day_type, period, 'week'::text AS range_type, week_number AS range_id,
+       round(avg(tt), 1) tt
+FROM king_pilot.dash_daily_mv
+WHERE category <> 'Excluded' AND week_number IS NOT NULL
+GROUP BY street, direction, day_type, period, week_number
+UNION ALL
+SELECT street, direction, day_type, period, 'month'::text, month_number, round(avg(tt), 1)
+FROM king_pilot.dash_daily_mv
+WHERE category <> 'Excluded' AND month_number IS NOT NULL
+GROUP BY street, direction, day_type, period, month_number
+UNION ALL
+SELECT street, direction, day_type, period, 'history'::text, 1, round(avg(tt), 1)
+FROM king_pilot.dash_daily_mv
+WHERE category = 'Pilot'
+GROUP BY street, direction, day_type, period;
+
+CREATE INDEX ON king_pilot.dash_periods_mv (period, day_type, range_type, range_id);
+
+-- Baseline of each series with the 15th and 85th percentiles of the daily
+-- travel times from before the pilot (PERCENTILE_BAND in app.py)
+CREATE MATERIALIZED VIEW king_pilot.dash_baseline_mv AS
+SELECT base.street, base.direction, from_intersection, to_intersection, base.day_type, base.period,
+       period_range, round(base.tt, 1) tt,
+       round(percentile_cont(0.15) WITHIN GROUP (ORDER BY daily.tt)::numeric, 1) tt_low,
+       round(percentile_cont(0.85) WITHIN GROUP (ORDER BY daily.tt)::numeric, 1) tt_high
+FROM king_pilot.dash_baseline base
+LEFT OUTER JOIN king_pilot.dash_daily_mv daily
+     ON daily.street = base.street AND daily.direction = base.direction
+     AND daily.day_type = base.day_type AND daily.period = base.period
+     AND daily.category = 'Baseline'
+GROUP BY base.street, base.direction, from_intersection, to_intersection, base.day_type, base.period,
+         period_range, base.tt;
@@ -0,0 +1,150 @@
+'''A small synthetic corridor read in place of the database, so that the app
+can be tested without one
+'''
+import logging
+import os
+import re
+import sqlite3
+import sys
+from datetime import date
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+import pandas.io.sql as pandasql
+from psycopg2.extensions import connection as PostgresConnection
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CORRIDOR = 'test_pilot'
+CORRIDOR_CONFIG = '''
+[test_pilot]
+title = Test Pilot
+orientations = ew
+label_ew = East-West Streets
+streets_ew = Queen, King
+directions_ew = Eastbound, Westbound
+max_time_ew = 30
+'''
+PERIODS = {'Weekday': [('AM Peak', '7-10 AM'), ('PM Peak', '4-7 PM')],
+           'Weekend': [('Afternoon', '12-6 PM')]}
+START, PILOT, END = date(2019, 1, 1), date(2019, 2, 11), date(2019, 4, 30)
+EXCLUDED = date(2019, 3, 5)
+# Days of sub-daily bins, up to END
+BIN_DAYS = 14
+BIN_MINUTES = 15
+
+
+def synthetic_tables():
+    '''Daily, baseline, week, month and bin tables of the test corridor, keyed
+    by table name, as the database returns them
+    '''
+    rng = np.random.RandomState(0)
+    weeks = pd.DataFrame({'week': pd.date_range(PILOT, END, freq='W-MON').date})
+    weeks['week_number'] = np.arange(1, len(weeks) + 1)
+    months = pd.DataFrame({'month': pd.date_range(PILOT.replace(day=1), END, freq='MS')})
+    months['month_number'] = np.arange(1, len(months) + 1)
+
+    baseline = pd.DataFrame([(street, direction, 'Bathurst', 'Jarvis', day_type, period, period_range,
+                              round(rng.uniform(5, 15), 1))
+                             for street in ['Queen', 'King'] for direction in ['Eastbound', 'Westbound']
+                             for day_type, periods in PERIODS.items() for period, period_range in periods],
+                            columns=['street', 'direction', 'from_intersection', 'to_intersection',
+                                     'day_type', 'period', 'period_range', 'tt'])
+
+    days = pd.date_range(START, END).date
+    daily = pd.DataFrame([(row.street, row.direction, day, row.day_type,
+                           'Excluded' if day == EXCLUDED else 'Baseline' if day < PILOT else 'Pilot',
+                           row.period, round(row.tt + rng.normal(0, 2), 1))
+                          for row in baseline.itertuples() for day in days
+                          # Some days are missing for each street
+                          if (day.weekday() > 4) == (row.day_type == 'Weekend') and rng.rand() > 0.05],
+                         columns=['street', 'direction', 'date', 'day_type', 'category', 'period', 'tt'])
+    last_days = daily.groupby(['direction', 'day_type', 'period'])['date'].transform('max')
+    daily['most_recent'] = (daily['date'] == last_days).astype(int)
+    week_numbers = dict(zip(weeks['week'], weeks['week_number']))
+    daily['week_number'] = [week_numbers.get(day - pd.Timedelta(days=day.weekday()).to_pytimedelta())
+                            for day in daily['date']]
+    month_numbers = dict(zip(months['month'].dt.date, months['month_number']))
+    daily['month_number'] = [month_numbers.get(day.replace(day=1)) for day in daily['date']]
+
+    bins = pd.DataFrame([(street, direction, day, minute, round(rng.uniform(5, 15), 1))
+                         for street in ['Queen', 'King'] for direction in ['Eastbound', 'Westbound']
+                         for day in days[-BIN_DAYS:] for minute in range(0, 24 * 60, BIN_MINUTES)],
+                        columns=['street', 'direction', 'date', 'minute', 'tt'])
+    return dict(dash_daily=daily, dash_baseline=baseline, pilot_weeks=weeks, pilot_months=months,
+                dash_bins=bins)
+
+
+def fake_read_sql(tables):
+    '''read_sql returning the table of tables the query selects from, after the
+    since date, or the result of the query on the SQLite stand-in or a real
+    database
+    '''
+    read_database = pandasql.read_sql
+
+    def read_sql(sql, con, params=None, **kwargs):
+        if isinstance(con, (sqlite3.Connection, PostgresConnection)):
+            return read_database(sql, con, params=params, **kwargs)
+        df = tables[re.search(r'FROM\s+(\S+)', sql).group(1).split('.')[-1]]
+        if params and 'since' in params:
+            df = df[df['date'] > params['since']]
+        return df.reset_index(drop=True)
+    return read_sql
+
+
+def fake_connect(tables):
+    '''psycopg2.connect returning connections whose cursors fetch the bins of
+    tables after the since date
+    '''
+    def cursor(name=None):
+        rows = []
+        cursor = mock.Mock()
+
+        def execute(sql, params):
+            bins = tables['dash_bins']
+            rows.extend(bins[bins['date'] > params['since']].itertuples(index=False, name=None))
+
+        def fetchmany(size):
+            chunk = rows[:size]
+            del rows[:size]
+            return chunk
+        cursor.execute.side_effect = execute
+        cursor.fetchmany.side_effect = fetchmany
+        return cursor
+
+    connection = mock.Mock()
+    connection.cursor.side_effect = cursor
+    return mock.Mock(return_value=connection)
+
+
+def start(directory, tables):
+    '''Start reading tables in place of the database, with the test corridor
+    configured in directory, and import the app
+
+    Returns the app and the patches to stop.
+    '''
+    config = os.path.join(directory, 'corridors.cfg')
+    with open(config, 'w') as config_file:
+        config_file.write(CORRIDOR_CONFIG)
+    connect = fake_connect(tables)
+    patches = [mock.patch.dict(os.environ, {'CORRIDOR_CONFIG': config,
+                                            'DATABASE_URL': 'postgresql://synthetic',
+                                            'DATA_BACKEND': 'memory'}),
+               mock.patch('psycopg2.connect', connect),
+               mock.patch('pandas.io.sql.read_sql', fake_read_sql(tables))]
+    for patch in patches:
+        patch.start()
+    logging.disable(logging.INFO)
+    import app
+    # The app keeps the connect it imported when first imported by another test
+    patches.append(mock.patch.object(app, 'connect', connect))
+    patches[-1].start()
+    return app, patches
+
+
+def stop(patches):
+    '''Stop the patches started by start'''
+    for patch in reversed(patches):
+        patch.stop()
+    logging.disable(logging.NOTSET)
@@ -0,0 +1,61 @@
+'''Check the memory used by the data and hot callbacks of the synthetic corridor
+against the budgets in memory_budgets.cfg, as memory_check.py does for the
+live data
+
+Budgets can be overridden as NAME=MB in MEMORY_BUDGETS, separated by spaces.
+
+    MEMORY_BUDGETS="generate_figure=20" python -m unittest discover tests
+'''
+import os
+import tempfile
+import tracemalloc
+import unittest
+
+import synthetic
+from synthetic import CORRIDOR
+# synthetic puts the directory of the app on the path
+import memory_check
+
+BUDGETS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'memory_budgets.cfg')
+
+
+class TestMemory(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.app, cls.patches = synthetic.start(cls.directory.name, synthetic.synthetic_tables())
+        cls.budgets = memory_check.load_budgets(BUDGETS, os.getenv('MEMORY_BUDGETS', '').split())
+
+    @classmethod
+    def tearDownClass(cls):
+        synthetic.stop(cls.patches)
+        cls.directory.cleanup()
+
+    def assertWithinBudgets(self, measured):
+        for name, size in measured.items():
+            if name in self.budgets:
+                with self.subTest(name=name):
+                    self.assertLessEqual(size, self.budgets[name],
+                                         '{} uses {:.2f} MB'.format(name, size / memory_check.MB))
+
+    def test_dataset(self):
+        sizes = memory_check.dataset_sizes(self.app.get_corridor_data(CORRIDOR))
+        self.assertWithinBudgets(dict(sizes, dataset=sum(sizes.values())))
+
+    def test_subdaily(self):
+        subdaily = self.app.get_subdaily(CORRIDOR)
+        self.assertEqual(subdaily.n_days, synthetic.BIN_DAYS)
+        self.assertWithinBudgets({'subdaily': subdaily.tt.nbytes})
+
+    def test_callbacks(self):
+        try:
+            peaks = memory_check.callback_peaks(self.app)
+        finally:
+            tracemalloc.stop()
+        self.assertIn('generate_drilldown', peaks)
+        self.assertWithinBudgets(peaks)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+'''Check that pushdown mode, on the SQLite stand-in for the materialized views,
+returns the same table and graph data as memory mode
+
+The synthetic corridor of synthetic.py is read in place of the database, so
+that no database is needed, and its stand-in is built with pushdown_sqlite.py.
+
+    python -m unittest discover tests
+'''
+import tempfile
+import unittest
+from unittest import mock
+
+from pandas.testing import assert_frame_equal
+
+import synthetic
+from synthetic import CORRIDOR, EXCLUDED, PERIODS, PILOT
+# synthetic puts the directory of the app on the path
+import pushdown_sqlite
+
+
+class TestPushdown(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        app, cls.patches = synthetic.start(cls.directory.name, synthetic.synthetic_tables())
+        cls.app = app
+
+        corridor_data = app.get_corridor_data(CORRIDOR)
+        pushdown_sqlite.write_tables(cls.directory.name, app.CORRIDORS[CORRIDOR],
+                                     pushdown_sqlite.pushdown_tables(app, corridor_data))
+        cls.patches.append(mock.patch.object(app, 'PUSHDOWN_SQLITE', cls.directory.name))
+        cls.patches[-1].start()
+        # Results cached from the views of other tests
+        app.cached_pushdown_query.cache_clear()
+        cls.caches = dict(memory=app.CORRIDOR_CACHE, pushdown=type(app.CORRIDOR_CACHE)())
+
+    @classmethod
+    def tearDownClass(cls):
+        synthetic.stop(cls.patches)
+        cls.directory.cleanup()
+
+    def in_backend(self, backend, function, *args):
+        '''Call function in memory or pushdown mode'''
+        with mock.patch.object(self.app, 'DATA_BACKEND', backend), \
+                mock.patch.object(self.app, 'CORRIDOR_CACHE', self.caches[backend]):
+            return function(*args)
+
+    def date_range_ids(self):
+        '''Date range ids to check for each date range type'''
+        corridor_data = self.in_backend('memory', self.app.get_corridor_data, CORRIDOR)
+        return {'Last Day': [1],
+                'Select Date': [PILOT, EXCLUDED, corridor_data.daterange[1]],
+                'Select Week': list(corridor_data.weeks['week_number']),
+                'Select Month': list(corridor_data.months['month_number']),
+                'Full History': [1]}
+
+    def test_date_range_types_covered(self):
+        self.assertEqual(list(self.date_range_ids()), self.app.DATERANGE_TYPES)
+
+    def test_table_data(self):
+        for daterange_type, date_range_ids in self.date_range_ids().items():
+            for date_range_id in date_range_ids:
+                for day_type, periods in PERIODS.items():
+                    for period, _ in periods:
+                        args = (period, day_type, 'ew', self.app.DATERANGE_TYPES.index(daterange_type),
+                                date_range_id, CORRIDOR)
+                        with self.subTest(daterange_type=daterange_type, date_range_id=date_range_id,
+                                          period=period):
+                            memory = self.in_backend('memory', self.app.filter_table_data, *args)
+                            pushdown = self.in_backend('pushdown', self.app.filter_table_data, *args)
+                            for memory_df, pushdown_df in zip(memory, pushdown):
+                                assert_frame_equal(memory_df.reset_index(drop=True),
+                                                   pushdown_df.reset_index(drop=True), check_dtype=False)
+
+    def test_graph_data(self):
+        for daterange_type, date_range_ids in self.date_range_ids().items():
+            for date_range_id in date_range_ids:
+                for street, direction in [('Queen', 'Eastbound'), ('King', 'Westbound')]:
+                    args = (street, direction, 'Weekday', 'AM Peak', self.app.DATERANGE_TYPES.index(daterange_type),
+                            date_range_id, CORRIDOR)
+                    with self.subTest(daterange_type=daterange_type, date_range_id=date_range_id,
+                                      street=street, direction=direction):
+                        memory = self.in_backend('memory', self.app.filter_graph_data, *args)
+                        pushdown = self.in_backend('pushdown', self.app.filter_graph_data, *args)
+                        # The baseline rows are in the order the database returns them
+                        assert_frame_equal(memory[0].reset_index(drop=True), pushdown[0].reset_index(drop=True))
+                        for memory_df, pushdown_df in zip(memory[1:], pushdown[1:]):
+                            # The views only return the columns the graphs use
+                            assert_frame_equal(memory_df[pushdown_df.columns].reset_index(drop=True),
+                                               pushdown_df.reset_index(drop=True), check_dtype=False)
+
+
+if __name__ == '__main__':
+    unittest.main()
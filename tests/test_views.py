@@ -0,0 +1,111 @@
+'''Check the materialized views of sql/create-mview-dash_pushdown.sql against
+memory mode, on the synthetic corridor of synthetic.py written to the
+database at TEST_DATABASE_URL
+
+The views are created in a test_pilot schema, which is dropped afterwards. The
+tests are skipped if TEST_DATABASE_URL isn't set.
+
+    TEST_DATABASE_URL=postgresql://user@localhost/test python -m unittest discover tests
+'''
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import pandas as pd
+from pandas.testing import assert_frame_equal
+from psycopg2 import connect
+from psycopg2.pool import ThreadedConnectionPool
+
+import synthetic
+from synthetic import CORRIDOR
+import test_pushdown
+# synthetic puts the directory of the app on the path
+import pushdown_sqlite
+
+TEST_DATABASE_URL = os.getenv('TEST_DATABASE_URL')
+VIEWS_SQL = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                         'sql', 'create-mview-dash_pushdown.sql')
+# Columns of the tables the views are created from
+SOURCE_TABLES = dict(dash_daily=[('street', 'text'), ('direction', 'text'), ('dt', 'date'), ('day_type', 'text'),
+                                 ('category', 'text'), ('period', 'text'), ('tt', 'numeric')],
+                     dash_baseline=[('street', 'text'), ('direction', 'text'), ('from_intersection', 'text'),
+                                    ('to_intersection', 'text'), ('day_type', 'text'), ('period', 'text'),
+                                    ('period_range', 'text'), ('tt', 'numeric')],
+                     pilot_weeks=[('week', 'date'), ('week_number', 'integer')],
+                     pilot_months=[('month', 'date'), ('month_number', 'integer')])
+# Columns identifying the rows of each view
+VIEW_KEYS = dict(daily_view=['street', 'direction', 'day_type', 'period', 'date'],
+                 periods_view=['street', 'direction', 'day_type', 'period', 'range_type', 'range_id'],
+                 baseline_view=['street', 'direction', 'day_type', 'period'])
+
+
+def create_views(con, tables):
+    '''Write the synthetic tables to the test_pilot schema and create the views
+    from them
+    '''
+    cursor = con.cursor()
+    cursor.execute('DROP SCHEMA IF EXISTS {0} CASCADE; CREATE SCHEMA {0}'.format(CORRIDOR))
+    for table, columns in SOURCE_TABLES.items():
+        df = tables[table].rename(columns={'date': 'dt'})
+        if table == 'pilot_months':
+            df = df.assign(month=df['month'].dt.date)
+        names = [name for name, _ in columns]
+        cursor.execute('CREATE TABLE {}.{} ({})'.format(CORRIDOR, table,
+                                                        ', '.join(' '.join(column) for column in columns)))
+        cursor.executemany('INSERT INTO {}.{} VALUES ({})'.format(CORRIDOR, table, ', '.join(['%s'] * len(names))),
+                           df[names].astype(object).values.tolist())
+    with open(VIEWS_SQL) as views_file:
+        cursor.execute(views_file.read().replace('king_pilot.', CORRIDOR + '.'))
+    cursor.close()
+
+
+@unittest.skipIf(TEST_DATABASE_URL is None, 'TEST_DATABASE_URL is not set')
+class TestViews(test_pushdown.TestPushdown):
+    '''The table and graph data checks of TestPushdown, on the views in the
+    database in place of the SQLite stand-in, and checks of the views themselves
+    '''
+
+    @classmethod
+    def setUpClass(cls):
+        tables = synthetic.synthetic_tables()
+        cls.con = connect(TEST_DATABASE_URL)
+        cls.con.autocommit = True
+        create_views(cls.con, tables)
+        cls.directory = tempfile.TemporaryDirectory()
+        app, cls.patches = synthetic.start(cls.directory.name, tables)
+        cls.app = app
+        # The patched psycopg2.connect is the one the pool calls
+        with mock.patch('psycopg2.connect', connect):
+            cls.pool = ThreadedConnectionPool(app.PUSHDOWN_POOL_SIZE, app.PUSHDOWN_POOL_SIZE, TEST_DATABASE_URL)
+        cls.patches.append(mock.patch.object(app, 'PUSHDOWN_POOL', cls.pool))
+        cls.patches[-1].start()
+        # Results cached from the views of other tests
+        app.cached_pushdown_query.cache_clear()
+        cls.caches = dict(memory=app.CORRIDOR_CACHE, pushdown=type(app.CORRIDOR_CACHE)())
+
+    @classmethod
+    def tearDownClass(cls):
+        synthetic.stop(cls.patches)
+        cls.app.cached_pushdown_query.cache_clear()
+        cls.pool.closeall()
+        cls.con.cursor().execute('DROP SCHEMA {} CASCADE'.format(CORRIDOR))
+        cls.con.close()
+        cls.directory.cleanup()
+
+    def test_views(self):
+        '''The views hold what pushdown_sqlite.py computes from memory mode'''
+        corridor = self.app.CORRIDORS[CORRIDOR]
+        memory = pushdown_sqlite.pushdown_tables(self.app, self.in_backend('memory', self.app.get_corridor_data,
+                                                                           CORRIDOR))
+        for table, keys in VIEW_KEYS.items():
+            with self.subTest(table=table):
+                view = pd.read_sql('SELECT * FROM ' + corridor.tables[table], self.con)
+                self.assertEqual(set(view.columns), set(memory[table].columns))
+                assert_frame_equal(memory[table].sort_values(keys).reset_index(drop=True),
+                                   view[memory[table].columns].sort_values(keys).reset_index(drop=True),
+                                   check_dtype=False)
+
+
+if __name__ == '__main__':
+    unittest.main()